@@ -1,21 +1,48 @@
-from pyomo.environ import ConcreteModel, SolverFactory, Objective, maximize, Constraint, Var
+from pyomo.environ import ConcreteModel, SolverFactory, Objective, maximize, Constraint, Var, value
 from parameters import Parameters
 from variables import Variables
 from constraints import Constraints
+from stream_table import StreamTable
+from solve_cache import SolveCache, cached_solve
+from presolve import BlockTriangularPresolve
+from telemetry import SolveTelemetry
+from contextlib import nullcontext
+import os
+import tempfile
+import time
+import numpy as np
 import pandas as pd
 
 class ChemicalModel:
     
-    def __init__(self):
+    def __init__(self, indexed=False, use_cache=True, reduced=False):
         self.model = ConcreteModel()
+        self.indexed = indexed
+        self.reduced = reduced  # Composition-free formulation: x is an Expression of the flows
         self.components = ['Benzene', 'Toluene', 'OrthoXylene', 'MetaXylene', 'ParaXylene']
         self.parameters = Parameters()
         
         # Set params as an attribute of model
         self.model.params = self.parameters.params
         
-        self.variables = Variables(self.model, self.components, self.model.params)
-        self.constraints = Constraints(self.model, self.model.params)
+        self.variables = Variables(self.model, self.components, self.model.params, indexed=indexed, reduced=reduced)
+        self.constraints = Constraints(self.model, self.model.params, indexed=indexed, reduced=reduced)
+
+        # Streams of the stream table; feed streams are taken from the parameters
+        self.table_streams = list(range(1, 11))
+        self.feed_streams = [1]
+        self._flow_vars = None  # Flow variables of the other table streams, gathered once
+
+        # Outcome of the last solve, recorded by run_record
+        self.results = None
+        self.solve_time = None
+        self.iterations = None  # Simplex iterations of the last solve
+
+        # Solutions of previous identical solves, shared by every run in this directory
+        self.solve_cache = SolveCache() if use_cache else None
+
+        # Structured record of every solve, appended to solve_telemetry.jsonl
+        self.telemetry = SolveTelemetry()
         
     def count_equations_and_unknowns(self):
         """
@@ -32,11 +59,28 @@ class ChemicalModel:
 
         return num_constraints, num_variables        
         
-    def solve(self):
+    def solve(self, use_cache=True, presolve=False, verbose=False):
         solver = SolverFactory('glpk')
 #         solver.options['constr_viol_tol'] = 1e-4
 #         solver.options['acceptable_constr_viol_tol'] = 1e-4
-        solver.solve(self.model, tee=True)
+        handle, logfile = tempfile.mkstemp(suffix='_glpk.log')
+        os.close(handle)
+
+        start = time.perf_counter()
+        # With presolve, the structurally determined blocks are solved directly and only
+        # the remainder goes to the solver (see BlockTriangularPresolve)
+        with BlockTriangularPresolve(self.model) if presolve else nullcontext() as presolved:
+            if presolve:
+                print(presolved)
+            self.results, cache_hit = cached_solve(self.solve_cache if use_cache else None, self.model, solver,
+                                                   self.model.params, tee=verbose, logfile=logfile)
+        self.solve_time = time.perf_counter() - start
+        record = self.telemetry.record(self.model, self.results, self.solve_time, logfile, flowsheet='BT_Separation',
+                                       cache_hit=cache_hit, presolve=presolve)
+        self.iterations = record['iterations']
+        os.remove(logfile)
+        if cache_hit:
+            print(f"Solution loaded from the solve cache ({self.solve_time * 1000:.1f} ms)")
 
     def fetch_value(self, var):
         """Fetch the value of a variable and round it."""
@@ -45,6 +89,18 @@ class ChemicalModel:
             return 0.0
         return round(val, 4)  
 
+    def total_flow(self, stream):
+        """Return the overall molar flow variable of a stream (e.g. 2 for S2)."""
+        if self.indexed:
+            return self.model.F[stream]
+        return getattr(self.model, f'S{stream}')
+
+    def component_flow(self, stream, component):
+        """Return the component molar flow variable of a stream (e.g. 2 for s2)."""
+        if self.indexed:
+            return self.model.f[stream, component]
+        return getattr(self.model, f's{stream}')[component]
+
     
     def generate_stream_data(self, stream_name):
         """Generate molar flow rates for a given stream."""
@@ -54,23 +110,56 @@ class ChemicalModel:
             s_flow = self.model.params[stream_name.upper()]
             molar_flow_rates = [s_flow * self.model.params[f'{stream_name.upper()}_{component}'] for component in self.components]
         else:
-            molar_flow_rates = [self.fetch_value(getattr(self.model, f's{stream_index}')[component]) for component in self.components]
+            molar_flow_rates = [self.fetch_value(self.component_flow(stream_index, component)) for component in self.components]
 
         return molar_flow_rates # list [1000, 100, 1, 10]
 
-    def generate_stream_table(self):
-        """Generate a table with molar flow rates of each component in each stream."""
-        data = []  # This will store rows of data which will be used to create DataFrame
-
-        # For each stream
-        for i in range(1, 11):  # Adjusted the range to start from S1
-            stream_name = f's{i}'
-            data.append(self.generate_stream_data(stream_name))
+    def stream_table(self):
+        """
+        Component flows of the table streams as a StreamTable, at full precision. Flow
+        values are read in one pass over the flow variables; feed streams are computed
+        from the parameters.
+        """
+        streams = self.table_streams
+        if self._flow_vars is None:
+            self._flow_vars = [self.component_flow(stream, component)
+                               for stream in streams if stream not in self.feed_streams
+                               for component in self.components]
+        flows = np.empty((len(streams), len(self.components)))
+        process_rows = [row for row, stream in enumerate(streams) if stream not in self.feed_streams]
+        flows[process_rows] = np.array([var.value for var in self._flow_vars], dtype=float).reshape(
+            len(process_rows), len(self.components))
+        for row, stream in enumerate(streams):
+            if stream in self.feed_streams:
+                flows[row] = [value(self.model.params[f'S{stream}']) * value(self.model.params[f'S{stream}_{component}'])
+                              for component in self.components]
+        return StreamTable([f's{stream}' for stream in streams], self.components, flows)
+
+    def run_record(self):
+        """Parameters, solver outcome and stream table of the last solve, for RunStore.add_run."""
+        results = self.results
+        objective = next(self.model.component_data_objects(Objective, active=True), None)
+        return {
+            'flowsheet': 'BT_Separation',
+            'status': str(results.solver.status) if results is not None else None,
+            'termination': str(results.solver.termination_condition) if results is not None else None,
+            'solve_time': self.solve_time,
+            'objective': value(objective, exception=False) if objective is not None else None,
+            'parameters': {name: value(param) for name, param in self.model.params.items()},
+            'stream_table': self.stream_table(),
+        }
 
-        # Creating DataFrame
-        stream_names = [f's{i}' for i in range(1, 11)]  # Adjusted the range to start from S1
-        df = pd.DataFrame(data, columns=self.components, index=stream_names)
-        return df
+    def generate_stream_table(self):
+        """
+        Generate a table with molar flow rates of each component in each stream. As in
+        fetch_value, flows without a value or negative are shown as 0 and the others are
+        rounded to 4 decimals; stream_table() keeps the full-precision values.
+        """
+        table = self.stream_table()
+        flows = table.flows.copy()
+        process_rows = [row for row, stream in enumerate(self.table_streams) if stream not in self.feed_streams]
+        flows[process_rows] = np.clip(np.nan_to_num(flows[process_rows], nan=0.0), 0.0, None).round(4)
+        return pd.DataFrame(flows, index=table.streams, columns=table.components)
 
     def display_results(self):
         # Helper function to fetch the value
@@ -99,7 +188,7 @@ class ChemicalModel:
 
             # Stream S Results
             s_results = [
-                f"S{i}: {fetch_value(getattr(model, f'S{i}'))}" for i in range(2, 11)
+                f"S{i}: {fetch_value(self.total_flow(i))}" for i in range(2, 11)
             ]
             # Add results for S1 from parameters
             s_results.insert(0, f"S1: {model.params['S1']}")
@@ -109,7 +198,7 @@ class ChemicalModel:
             components = ['Benzene', 'Toluene', 'OrthoXylene', 'MetaXylene', 'ParaXylene']
             
             molar_flowRate_results = [
-                f"Molar Flow rate of[{component}] in S{i}: {fetch_value(getattr(model, f's{i}')[component])}" 
+                f"Molar Flow rate of[{component}] in S{i}: {fetch_value(self.component_flow(i, component))}" 
                 for i in range(2, 11) for component in components
             ]
             # Add composition results for S1 from parameters
@@ -5,8 +5,10 @@ from functools import partial
 class Constraints:
     components = ["Benzene", "Toluene", "OrthoXylene", "MetaXylene", "ParaXylene"]
     
-    def __init__(self, model, parameters=None):
+    def __init__(self, model, parameters=None, indexed=False, reduced=False):
         self.model = model
+        self.indexed = indexed
+        self.reduced = reduced
         if parameters:
             self.define_constraints(model, parameters)
 
@@ -17,12 +19,17 @@ class Constraints:
             model.del_component(model.streams)
         model.streams = RangeSet(2, 11)
         
-        model.composition_sum_constraint = Constraint(model.streams, rule=self.composition_sum_rule)
+        # The reduced formulation has no composition variables to constrain
+        if not self.reduced:
+            model.composition_sum_constraint = Constraint(model.streams, rule=self.composition_sum_rule)
         
         
         # Add overall material balance constraints for streams S2 to S7
-        for i in model.streams:  # For streams S2 to S7
-            setattr(model, f'Eq0_S{i}', Constraint(expr=self.overall_material_balance(model, i)))
+        if self.indexed:
+            model.Eq0 = Constraint(model.streams, rule=self.overall_material_balance)
+        else:
+            for i in model.streams:  # For streams S2 to S7
+                setattr(model, f'Eq0_S{i}', Constraint(expr=self.overall_material_balance(model, i)))
 
             
         # Map each constraint to its corresponding function
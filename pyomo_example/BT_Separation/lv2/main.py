@@ -1,8 +1,10 @@
 from chemical_model import ChemicalModel
+from run_store import RunStore
 import pandas as pd
 
 if __name__ == "__main__":
     chemical_model = ChemicalModel()
+    #chemical_model = ChemicalModel(reduced=True)  # Composition-free formulation
     num_eq, num_var = chemical_model.count_equations_and_unknowns()
     if (num_eq == num_var):
         print("DOF = 0")
@@ -10,6 +12,11 @@ if __name__ == "__main__":
     if (num_eq != num_var):
         print(f"DOF = {num_var - num_eq}")
     
+    #chemical_model.solve(presolve=True)
     chemical_model.solve()
     chemical_model.display_results()
-    chemical_model.generate_stream_table()
\ No newline at end of file
+    chemical_model.generate_stream_table()
+
+    # Keep every run in the run history database
+    with RunStore('run_history.db') as run_store:
+        run_store.add_run(chemical_model.run_record())
\ No newline at end of file
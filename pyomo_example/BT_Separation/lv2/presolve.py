@@ -0,0 +1,190 @@
+import numpy as np
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import splu, onenormest, LinearOperator
+from pyomo.environ import Constraint, value
+from pyomo.common.collections import ComponentMap, ComponentSet
+from pyomo.contrib.incidence_analysis import IncidenceGraphInterface
+from pyomo.core.expr.calculus.derivatives import differentiate, Modes
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.repn import generate_standard_repn
+
+
+class BlockTriangularPresolve:
+    """
+    Solve the structurally determined part of a model before handing it to the solver.
+
+    The Dulmage-Mendelsohn decomposition of the equality constraints separates the
+    overconstrained and square subsystems, whose variables do not depend on the degrees
+    of freedom, from the underconstrained remainder. The overconstrained part is solved
+    first, then the blocks of the block-triangularized square part in order: linear
+    blocks with a sparse LU factorization (the overdetermined one by least squares) and
+    nonlinear blocks of up to max_newton_size equations with Newton's method. The
+    variables of every solved block are fixed and the constraints left without free
+    variables are deactivated, so the solver only sees the coupled remainder. Blocks
+    that fail (singular or ill-conditioned beyond max_condition, residual above
+    tolerance, not converged, or outside the variable bounds) are left to the solver,
+    and so is every block depending on them.
+
+    A constraint without free variables is only deactivated if it holds at the fixed
+    values; apply() raises a ValueError (after restoring the model) if any is violated
+    by more than tolerance relative to its terms, since the model is then infeasible.
+
+    Use as a context manager around the solve, or call apply() and restore():
+        with BlockTriangularPresolve(model):
+            solver.solve(model)
+    """
+
+    def __init__(self, model, max_newton_size=5, tolerance=1e-8, max_iterations=50, max_condition=1e12):
+        self.model = model
+        self.max_newton_size = max_newton_size
+        self.tolerance = tolerance
+        self.max_condition = max_condition
+        self.max_iterations = max_iterations
+        self.fixed = []        # Variables fixed by the presolve
+        self.deactivated = []  # Constraints deactivated by the presolve
+        self.blocks = []       # (size, 'linear' or 'nonlinear', solved) of every block, in order
+
+    def __enter__(self):
+        return self.apply()
+
+    def __exit__(self, *exc_info):
+        self.restore()
+
+    def __repr__(self):
+        solved = [kind for _, kind, ok in self.blocks if ok]
+        return (f"BlockTriangularPresolve({len(self.fixed)} variables fixed: {solved.count('linear')} linear "
+                f"and {solved.count('nonlinear')} Newton blocks of {len(self.blocks)}, "
+                f"{len(self.deactivated)} constraints removed)")
+
+    def apply(self):
+        igraph = IncidenceGraphInterface(self.model, include_inequality=False)
+        var_dm, con_dm = igraph.dulmage_mendelsohn()
+
+        # The overconstrained part is determined by all of its equations together (its
+        # matched subsystem alone can be singular), so it is solved as one block; the
+        # square part block by block
+        blocks = []
+        if var_dm.overconstrained:
+            blocks.append((var_dm.overconstrained, con_dm.overconstrained + con_dm.unmatched))
+        if var_dm.square:
+            blocks.extend(zip(*igraph.block_triangularize(var_dm.square, con_dm.square)))
+
+        unsolved = ComponentSet()
+        for block_vars, block_cons in blocks:
+            repns = [generate_standard_repn(c.body, compute_values=True) for c in block_cons]
+            kind = 'linear' if all(repn.is_linear() for repn in repns) else 'nonlinear'
+            block_set = ComponentSet(block_vars)
+            depends_on_unsolved = any(var not in block_set for c in block_cons
+                                      for var in identify_variables(c.body, include_fixed=False))
+
+            solved = False
+            if not depends_on_unsolved and (kind == 'linear' or len(block_vars) <= self.max_newton_size):
+                solved = self._solve_block(block_vars, block_cons, repns if kind == 'linear' else None)
+            self.blocks.append((len(block_vars), kind, solved))
+
+            if solved:
+                for var in block_vars:
+                    var.fix()
+                self.fixed.extend(block_vars)
+            else:
+                unsolved.update(block_vars)
+
+        # Constraints without free variables must hold at the fixed values: the solver
+        # could not change them either
+        fully_fixed = [constraint for constraint in self.model.component_data_objects(Constraint, active=True)
+                       if next(identify_variables(constraint.body, include_fixed=False), None) is None]
+        violated = [constraint.name for constraint in fully_fixed if not self._satisfied(constraint)]
+        if violated:
+            self.restore()
+            raise ValueError(f"The model is infeasible: {len(violated)} constraints without free variables "
+                             f"are violated at the fixed values ({', '.join(violated[:10])}"
+                             f"{', ...' if len(violated) > 10 else ''}).")
+        for constraint in fully_fixed:
+            constraint.deactivate()
+            self.deactivated.append(constraint)
+        return self
+
+    def _satisfied(self, constraint):
+        """Whether the constraint holds within tolerance, relative to the size of its body and bounds."""
+        body = value(constraint.body, exception=False)
+        if body is None:
+            return False
+        lower = value(constraint.lower) if constraint.has_lb() else None
+        upper = value(constraint.upper) if constraint.has_ub() else None
+        scale = max([1.0, abs(body)] + [abs(bound) for bound in (lower, upper) if bound is not None])
+        tolerance = self.tolerance * scale
+        return (lower is None or body >= lower - tolerance) and (upper is None or body <= upper + tolerance)
+
+    def restore(self):
+        """Unfix the presolved variables (keeping their values) and reactivate the constraints."""
+        for var in self.fixed:
+            var.unfix()
+        for constraint in self.deactivated:
+            constraint.activate()
+        self.fixed, self.deactivated = [], []
+
+    def _solve_block(self, variables, constraints, repns):
+        """Solve one block in place. Returns False, leaving the values unchanged, on failure."""
+        start = [var.value for var in variables]
+        try:
+            if repns is not None:
+                x = self._solve_linear(variables, constraints, repns)
+            else:
+                x = self._solve_newton(variables, constraints)
+        except (ArithmeticError, ValueError, RuntimeError, np.linalg.LinAlgError):
+            x = None
+
+        within_bounds = x is not None and np.all(np.isfinite(x)) and all(
+            (var.lb is None or x_i >= var.lb - self.tolerance) and (var.ub is None or x_i <= var.ub + self.tolerance)
+            for var, x_i in zip(variables, x))
+        for var, var_value in zip(variables, x if within_bounds else start):
+            var.set_value(None if var_value is None else float(var_value), skip_validation=True)
+        return bool(within_bounds)
+
+    def _solve_linear(self, variables, constraints, repns):
+        """
+        A x = b with a sparse LU factorization; raises RuntimeError if A is singular, and
+        returns None if its estimated condition number exceeds max_condition or the
+        solution leaves a residual above tolerance (relative to b). An overdetermined A is
+        solved in the least-squares sense and must have full column rank and a consistent
+        right-hand side.
+        """
+        column = ComponentMap((var, j) for j, var in enumerate(variables))
+        rows, columns, coefficients = [], [], []
+        b = np.empty(len(constraints))
+        for i, (constraint, repn) in enumerate(zip(constraints, repns)):
+            for var, coefficient in zip(repn.linear_vars, repn.linear_coefs):
+                rows.append(i)
+                columns.append(column[var])
+                coefficients.append(coefficient)
+            b[i] = value(constraint.upper) - repn.constant
+        A = csc_matrix((coefficients, (rows, columns)), shape=(len(constraints), len(variables)))
+        if len(constraints) == len(variables):
+            lu = splu(A)
+            inverse = LinearOperator(A.shape, matvec=lu.solve, rmatvec=lambda y: lu.solve(y, trans='T'),
+                                     dtype=float)
+            if not onenormest(A) * onenormest(inverse) <= self.max_condition:  # 1-norm condition estimate
+                return None
+            x = lu.solve(b)
+        else:
+            x, _, rank, _ = np.linalg.lstsq(A.toarray(), b, rcond=None)
+            if rank < len(variables):
+                return None
+        if np.max(np.abs(A @ x - b)) > self.tolerance * max(1.0, np.max(np.abs(b))):
+            return None
+        return x
+
+    def _solve_newton(self, variables, constraints):
+        """Newton's method from the current values; returns None if it does not converge."""
+        residuals = [c.body - c.upper for c in constraints]
+        x = np.array([var.value if var.value is not None else 0.0 for var in variables], dtype=float)
+        for _ in range(self.max_iterations):
+            for var, x_i in zip(variables, x):
+                var.set_value(float(x_i), skip_validation=True)
+            f = np.array([value(residual) for residual in residuals])
+            if np.max(np.abs(f)) < self.tolerance:
+                return x
+            jacobian = np.array([differentiate(residual, wrt_list=variables, mode=Modes.reverse_numeric)
+                                 for residual in residuals], dtype=float)
+            x = x + np.linalg.solve(jacobian, -f)
+        return None
@@ -0,0 +1,174 @@
+import sqlite3
+from datetime import datetime
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY,
+    flowsheet   TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    status      TEXT,
+    termination TEXT,
+    solve_time  REAL,
+    objective   REAL
+);
+CREATE INDEX IF NOT EXISTS runs_by_flowsheet ON runs (flowsheet, created_at);
+
+CREATE TABLE IF NOT EXISTS parameters (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    name   TEXT NOT NULL,
+    value  REAL,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS parameters_by_value ON parameters (name, value, run_id);
+
+CREATE TABLE IF NOT EXISTS flows (
+    run_id    INTEGER NOT NULL REFERENCES runs (run_id),
+    stream    TEXT NOT NULL,
+    component TEXT NOT NULL,
+    flow      REAL,
+    position  INTEGER NOT NULL,  -- Row-major position in the stream table
+    PRIMARY KEY (run_id, stream, component)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS flows_by_value ON flows (stream, component, flow, run_id);
+"""
+
+OPERATORS = ('=', '!=', '<', '<=', '>', '>=')
+
+
+def _table_flows(stream_table):
+    """(stream, component, flow, position) of a StreamTable or a (streams x components) DataFrame."""
+    if isinstance(stream_table, pd.DataFrame):
+        streams, components, flows = stream_table.index, stream_table.columns, stream_table.to_numpy(dtype=float)
+    else:
+        streams, components, flows = stream_table.streams, stream_table.components, stream_table.flows
+    return [(str(stream), str(component), float(flow), i * len(components) + j)
+            for i, (stream, row) in enumerate(zip(streams, flows))
+            for j, (component, flow) in enumerate(zip(components, row))]
+
+
+class RunStore:
+    """
+    Run history of the flowsheets in a SQLite database: one row per run (status,
+    termination condition, solve time, objective) with its parameters and its full
+    stream table, both indexed by value.
+
+    Runs are buffered and written batch_size at a time, each batch in one transaction.
+    Use as a context manager (or call flush()) so the last batch is written.
+    """
+
+    def __init__(self, path='run_history.db', batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def add_run(self, record):
+        """
+        Queue a run record, as returned by ChemicalModel.run_record():
+        {'flowsheet', 'status', 'termination', 'solve_time', 'objective',
+         'parameters': {name: value}, 'stream_table': StreamTable}
+        The stream table may also be a DataFrame (streams as index, components as
+        columns), or None.
+        """
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def add_runs(self, records):
+        for record in records:
+            self.add_run(record)
+
+    def flush(self):
+        """Write the queued runs in one transaction. Returns their run ids."""
+        if not self.pending:
+            return []
+        created_at = datetime.now().isoformat(timespec='seconds')
+        run_ids = []
+        with self.connection:
+            for record in self.pending:
+                cursor = self.connection.execute(
+                    'INSERT INTO runs (flowsheet, created_at, status, termination, solve_time, objective) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (record['flowsheet'], created_at, record.get('status'), record.get('termination'),
+                     record.get('solve_time'), record.get('objective')))
+                run_ids.append(cursor.lastrowid)
+            self.connection.executemany(
+                'INSERT INTO parameters (run_id, name, value) VALUES (?, ?, ?)',
+                ((run_id, name, value)
+                 for run_id, record in zip(run_ids, self.pending)
+                 for name, value in record.get('parameters', {}).items()))
+            self.connection.executemany(
+                'INSERT INTO flows (run_id, stream, component, flow, position) VALUES (?, ?, ?, ?, ?)',
+                ((run_id, *flow)
+                 for run_id, record in zip(run_ids, self.pending) if record.get('stream_table') is not None
+                 for flow in _table_flows(record['stream_table'])))
+        self.pending = []
+        return run_ids
+
+    def query(self, flowsheet=None, where=None, order_by=None, descending=True, limit=None):
+        """
+        Runs matching parameter conditions, optionally sorted by a component flow.
+
+        where maps parameter names to (operator, value), e.g. {'FR_S15_LK': ('>', 0.98)};
+        order_by is a (stream, component) pair, e.g. ('s15', 'Benzene'), whose flow is
+        returned in an 'order_flow' column. Returns a DataFrame of the runs table.
+
+        Example: all HDA runs with FR_S15_LK > 0.98 sorted by benzene product flow:
+            store.query('HDA', {'FR_S15_LK': ('>', 0.98)}, order_by=('s15', 'Benzene'))
+        """
+        self.flush()
+        columns = 'r.*'
+        joins, join_arguments = [], []
+        conditions, condition_arguments = [], []
+
+        if flowsheet is not None:
+            conditions.append('r.flowsheet = ?')
+            condition_arguments.append(flowsheet)
+        for i, (name, (operator, value)) in enumerate((where or {}).items()):
+            if operator not in OPERATORS:
+                raise ValueError(f"Unknown operator '{operator}'. Choose from {OPERATORS}.")
+            joins.append(f'JOIN parameters p{i} ON p{i}.run_id = r.run_id AND p{i}.name = ?')
+            join_arguments.append(name)
+            conditions.append(f'p{i}.value {operator} ?')
+            condition_arguments.append(value)
+        if order_by is not None:
+            joins.append('JOIN flows f ON f.run_id = r.run_id AND f.stream = ? AND f.component = ?')
+            join_arguments += list(order_by)
+            columns += ', f.flow AS order_flow'
+
+        sql = f'SELECT {columns} FROM runs r ' + ' '.join(joins)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if order_by is not None:
+            sql += f" ORDER BY f.flow {'DESC' if descending else 'ASC'}"
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        return pd.read_sql_query(sql, self.connection, params=join_arguments + condition_arguments)
+
+    def parameters(self, run_id):
+        """Parameters of one run as a Series."""
+        self.flush()
+        rows = self.connection.execute('SELECT name, value FROM parameters WHERE run_id = ?', (run_id,))
+        return pd.Series(dict(rows.fetchall()), dtype=float)
+
+    def stream_table(self, run_id):
+        """Stream table of one run as a DataFrame (streams x components), in the order it was stored."""
+        self.flush()
+        flows = pd.read_sql_query('SELECT stream, component, flow FROM flows WHERE run_id = ? ORDER BY position',
+                                  self.connection, params=(run_id,))
+        table = flows.pivot(index='stream', columns='component', values='flow')
+        return table.reindex(index=flows['stream'].unique(), columns=flows['component'].unique())
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+
+class StreamTable:
+    """
+    Component molar flows of a flowsheet solution as one (streams x components) array.
+
+    The array is stored column-major, so every component column is contiguous and the
+    pandas and Arrow views share its memory instead of copying it. Values are kept at
+    full precision; flows without a value are NaN.
+    """
+
+    def __init__(self, streams, components, flows):
+        self.streams = list(streams)
+        self.components = list(components)
+        self.flows = np.asfortranarray(flows, dtype=float)
+        if self.flows.shape != (len(self.streams), len(self.components)):
+            raise ValueError(f"Flows of shape {self.flows.shape} do not match "
+                             f"{len(self.streams)} streams x {len(self.components)} components.")
+
+    def __repr__(self):
+        return f"StreamTable({len(self.streams)} streams x {len(self.components)} components)"
+
+    @property
+    def totals(self):
+        """Total molar flow of every stream."""
+        return self.flows.sum(axis=1)
+
+    @property
+    def composition(self):
+        """Mole fractions, (streams x components); zero for streams without flow."""
+        totals = self.totals[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(totals > 0, self.flows / totals, 0.0)
+
+    def to_pandas(self, derived=False):
+        """
+        DataFrame view of the flows (streams as index, components as columns). With
+        derived=True the total flow and the mole fractions are added as columns, which
+        requires a copy.
+        """
+        df = pd.DataFrame(self.flows, index=self.streams, columns=self.components, copy=False)
+        if derived:
+            composition = pd.DataFrame(self.composition, index=self.streams,
+                                       columns=[f'x_{component}' for component in self.components])
+            df = pd.concat([df.assign(Total=self.totals), composition], axis=1)
+        return df
+
+    def to_arrow(self):
+        """Arrow table with a 'stream' column and one zero-copy column per component."""
+        import pyarrow as pa
+        columns = [pa.array(self.streams)] + [pa.array(self.flows[:, j]) for j in range(len(self.components))]
+        return pa.Table.from_arrays(columns, names=['stream'] + self.components)
+
+    @staticmethod
+    def stack(tables):
+        """Flows of many solutions of the same flowsheet as a (runs x streams x components) array."""
+        return np.stack([table.flows for table in tables])
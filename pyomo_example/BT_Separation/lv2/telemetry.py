@@ -0,0 +1,97 @@
+import json
+import re
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+from pyomo.environ import Constraint, Objective, value
+
+
+def solver_log_statistics(logfile):
+    """
+    Iterations and function-evaluation time from a solver log, None where the log does
+    not report them: ipopt prints both in its summary, glpk one line per simplex
+    iteration ('*    12: obj = ...').
+    """
+    try:
+        with open(logfile) as file:
+            text = file.read()
+    except (FileNotFoundError, TypeError):
+        text = ''
+
+    match = re.search(r'Number of Iterations\.*:\s*(\d+)', text)
+    simplex = re.findall(r'^[ *]\s*(\d+): obj =', text, flags=re.MULTILINE)
+    iterations = int(match.group(1)) if match else int(simplex[-1]) if simplex else None
+    match = re.search(r'Total (?:CPU )?sec(?:ond)?s in NLP function evaluations\s*=\s*([-+.\deE]+)', text)
+    return {'iterations': iterations, 'function_evaluation_time': float(match.group(1)) if match else None}
+
+
+def max_infeasibility(model):
+    """
+    Largest bound violation of the active constraints at the current point; inf if a
+    constraint cannot be evaluated there (e.g. a division by zero).
+    """
+    worst = 0.0
+    for constraint in model.component_data_objects(Constraint, active=True):
+        try:
+            body = value(constraint.body, exception=False)
+        except (ArithmeticError, ValueError):
+            return float('inf')
+        if body is None:
+            continue
+        if constraint.has_lb():
+            worst = max(worst, value(constraint.lower) - body)
+        if constraint.has_ub():
+            worst = max(worst, body - value(constraint.upper))
+    return worst
+
+
+class SolveTelemetry:
+    """
+    Structured solve log: one JSON object per solve (wall time, iterations, function-
+    evaluation time, status and termination condition, final infeasibility and
+    objective), appended as a line to a JSONL file shared by every run in the directory.
+
+    Records carry the labels of the enclosing tagged() blocks, so the solves of a tearing
+    loop or a sweep can be told apart and totalled:
+        with telemetry.tagged(caller='solve_with_tearing'):
+            ...
+        telemetry.load().groupby('caller')['wall_time'].sum()
+    """
+
+    def __init__(self, path='solve_telemetry.jsonl', enabled=True):
+        self.path = path
+        self.enabled = enabled
+        self.tags = {}
+
+    @contextmanager
+    def tagged(self, **tags):
+        previous = self.tags
+        self.tags = {**previous, **tags}
+        try:
+            yield self
+        finally:
+            self.tags = previous
+
+    def record(self, model, results, wall_time, logfile=None, **fields):
+        """Append the record of one solve of model and return it."""
+        objective = next(model.component_data_objects(Objective, active=True), None)
+        entry = {
+            'created_at': datetime.now().isoformat(timespec='milliseconds'),
+            **self.tags,
+            **fields,
+            'wall_time': wall_time,
+            **solver_log_statistics(logfile),
+            'status': str(results.solver.status) if results is not None else None,
+            'termination': str(results.solver.termination_condition) if results is not None else None,
+            'infeasibility': max_infeasibility(model),
+            'objective': value(objective, exception=False) if objective is not None else None,
+        }
+        if self.enabled:
+            # One write per line, so records appended by concurrent worker processes do not interleave
+            with open(self.path, 'a') as file:
+                file.write(json.dumps(entry, default=str) + '\n')
+        return entry
+
+    def load(self):
+        """All records of the file as a DataFrame."""
+        return pd.read_json(self.path, lines=True)
@@ -1,7 +1,9 @@
-from pyomo.environ import Var, NonNegativeReals, RangeSet
+from pyomo.environ import Var, Expression, NonNegativeReals, RangeSet
 
 class Variables:
-    def __init__(self, model, components, parameters):
+    def __init__(self, model, components, parameters, indexed=False, reduced=False):
+        self.indexed = indexed
+        self.reduced = reduced
         self.define_variables(model, components, parameters)
 
     def define_variables(self, model, components, parameters):
@@ -10,12 +12,40 @@ class Variables:
         # Define a set for the streams (10 streams only)
         model.streams = RangeSet(2, 11)
 
-        for i in model.streams:
-            # Overall Stream molar flow rates
-            setattr(model, f'S{i}', Var(within=NonNegativeReals, initialize=1000))
+        if self.indexed:
+            self._define_indexed_stream_variables(model, components, 1000, initial_value)
+        else:
+            for i in model.streams:
+                # Overall Stream molar flow rates
+                setattr(model, f'S{i}', Var(within=NonNegativeReals, initialize=1000))
+
+                # Individual component stream flow rates
+                setattr(model, f's{i}', Var(components, within=NonNegativeReals, initialize=initial_value))
+
+        # Individual component molar composition for all streams; in the reduced formulation
+        # an Expression of the flows, evaluated on demand and not part of the NLP
+        if self.reduced:
+            model.x = Expression(model.streams, components, rule=self._composition)
+        else:
+            model.x = Var(model.streams, components, within=NonNegativeReals, bounds=[0, 1])
 
-            # Individual component stream flow rates
-            setattr(model, f's{i}', Var(components, within=NonNegativeReals, initialize=initial_value))
+    @staticmethod
+    def _composition(model, stream, component):
+        return getattr(model, f's{stream}')[component] / getattr(model, f'S{stream}')
 
-        # Individual component molar composition for all streams
-        model.x = Var(model.streams, components, within=NonNegativeReals, bounds=[0, 1])
+    def _define_indexed_stream_variables(self, model, components, total_initial, component_initial):
+        """
+        Define all stream flows as two indexed components instead of one
+        S{i} / s{i} pair per stream.
+        """
+        # Overall Stream molar flow rates
+        model.F = Var(model.streams, within=NonNegativeReals, initialize=total_initial)
+
+        # Individual component stream flow rates
+        model.f = Var(model.streams, components, within=NonNegativeReals, initialize=component_initial)
+
+        # Plain (non-component) aliases so the unit equations can keep writing
+        # model.S2 / model.s2['Benzene']
+        for i in model.streams:
+            setattr(model, f'S{i}', model.F[i])
+            setattr(model, f's{i}', {component: model.f[i, component] for component in components})
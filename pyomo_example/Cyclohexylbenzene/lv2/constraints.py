@@ -5,8 +5,10 @@ from functools import partial
 class Constraints:
     components = ['Hydrogen', 'Methane', 'Benzene', 'Cyclohexane', 'Cyclohexene', 'Cyclohexylbenzene']
 
-    def __init__(self, model, parameters=None):
+    def __init__(self, model, parameters=None, indexed=False, reduced=False):
         self.model = model
+        self.indexed = indexed
+        self.reduced = reduced
         if parameters:
             self.define_constraints(model, parameters)
 
@@ -17,12 +19,17 @@ class Constraints:
             model.del_component(model.streams)
         model.streams = RangeSet(20, 39)
         
-        model.composition_sum_constraint = Constraint(model.streams, rule=self.composition_sum_rule)
+        # The reduced formulation has no composition variables to constrain
+        if not self.reduced:
+            model.composition_sum_constraint = Constraint(model.streams, rule=self.composition_sum_rule)
         
         
         # Add overall material balance constraints for streams S19 to S41
-        for i in model.streams:  # For streams S19 to S41
-            setattr(model, f'Eq0_S{i}', Constraint(expr=self.overall_material_balance(model, i)))
+        if self.indexed:
+            model.Eq0 = Constraint(model.streams, rule=self.overall_material_balance)
+        else:
+            for i in model.streams:  # For streams S19 to S41
+                setattr(model, f'Eq0_S{i}', Constraint(expr=self.overall_material_balance(model, i)))
             
         # Map each constraint to its corresponding function
         constraints_mapping = {
@@ -1,8 +1,10 @@
 from chemical_model import ChemicalModel
+from run_store import RunStore
 import pandas as pd
 
 if __name__ == "__main__":
     chemical_model = ChemicalModel()
+    #chemical_model = ChemicalModel(reduced=True)  # Composition-free formulation
     num_eq, num_var = chemical_model.count_equations_and_unknowns()
     
     if (num_eq == num_var):
@@ -11,24 +13,36 @@ if __name__ == "__main__":
     if (num_eq != num_var):
         print(f"DOF = {num_var - num_eq}")    
 
-#     s22_range = [i for i in range(10, 100, 10)]  # Example range: 10, 20, ..., 90
-#     s23_range = [i for i in range(10, 100, 10)]  # Example range: 10, 20, ..., 90
+#     s25_range = [i for i in range(10, 100, 10)]  # Example range: 10, 20, ..., 90
+#     s30_range = [i for i in range(10, 100, 10)]  # Example range: 10, 20, ..., 90
 
-#     successful, failed = chemical_model.find_optimal_initial_values(s22_range, s23_range)
+#     optimal_values, error_map = chemical_model.find_optimal_initial_values(s25_range, s30_range, max_workers=4)
 
-#     print("Successful initializations:", successful)
-#     print("Failed initializations:", failed)
+#     print("Optimal initial values:", optimal_values)
+#     print(error_map.unstack())
 #     chemical_model.identify_redundant_constraints_sensitivity()
 #     chemical_model.identify_redundant_constraints_deactivation() 
+#     print(chemical_model.screen_redundant_constraints(max_workers=4))
+#     print(chemical_model.parameter_sensitivity())
+#     print(chemical_model.predict_stream_table({'FR_S19_LK': 0.995}))
 
 
+    #chemical_model.initialize()  # Mass-balance-consistent starting point
+    #chemical_model.select_tearing_streams()
     #chemical_model.solve_with_tearing()
+    #chemical_model.solve_sequential_modular()
     #chemical_model.display_results()
     #chemical_model.generate_stream_table()
     
+    #chemical_model.solve(presolve=True)
+    #chemical_model.solve(scale=True)  # Automatic scaling; compare with print(chemical_model.scaling_report())
     chemical_model.solve()
     chemical_model.display_results()
-    chemical_model.generate_stream_table()    
+    chemical_model.generate_stream_table()
+
+    # Keep every run in the run history database
+    with RunStore('run_history.db') as run_store:
+        run_store.add_run(chemical_model.run_record())
     
 #         chemical_model.identify_redundant_constraints_sensitivity()
 #         chemical_model.identify_redundant_constraints_deactivation()
\ No newline at end of file
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+# Batch form of the construction in McCabe-Thiele's method.ipynb: every function takes
+# arrays (or scalars, broadcast against each other) with one entry per column design.
+
+
+def feed_intersection(xF, q, alpha):
+    """
+    Intersection (xiE, yiE) of the q-line with the equilibrium curve: the smallest
+    positive root of q(alpha - 1) x^2 + [q + xF(1 - alpha) - alpha(q - 1)] x - xF = 0
+    (Eq3 of the notebook), which reduces to a linear equation for saturated vapour
+    feeds (q = 0).
+    """
+    xF, q, alpha = np.broadcast_arrays(*(np.asarray(array, dtype=float) for array in (xF, q, alpha)))
+    c1 = q * (alpha - 1)
+    c2 = q + xF * (1 - alpha) - alpha * (q - 1)
+    c3 = -xF
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Roots without cancellation: u = -(c2 + sign(c2) sqrt(D)) / 2 gives u / c1 and c3 / u
+        u = -(c2 + np.where(c2 >= 0, 1.0, -1.0) * np.sqrt(c2 ** 2 - 4 * c1 * c3)) / 2
+        roots = np.stack([u / c1, c3 / u])
+        roots = np.where(roots > 0, roots, np.inf).min(axis=0)
+        linear = np.isclose(c1, 0)
+        xiE = np.where(linear, -c3 / c2, roots)
+        xiE = np.where(np.isfinite(xiE), xiE, np.nan)
+    return xiE, equilibrium_y(xiE, alpha)
+
+
+def equilibrium_y(x, alpha):
+    """Vapour mole fraction in equilibrium with liquid x (constant relative volatility, Eq1)."""
+    return alpha * x / (1 + (alpha - 1) * x)
+
+
+def equilibrium_x(y, alpha):
+    """Liquid mole fraction in equilibrium with vapour y (inverse of Eq1)."""
+    return y / (alpha - y * (alpha - 1))
+
+
+def minimum_reflux(xD, xiE, yiE):
+    """Minimum reflux ratio from the q-line pinch point (Eq5)."""
+    return (xD - yiE) / (yiE - xiE)
+
+
+def feed_point(xF, xD, R, q):
+    """
+    Intersection (xiF, yiF) of the rectifying operating line (Eq4) with the q-line, in a
+    form without the singularity of the notebook's expression at q = 1.
+    """
+    xiF = (xF * (R + 1) + (q - 1) * xD) / (R + q)
+    return xiF, (R * xiF + xD) / (R + 1)
+
+
+def step_stages(xD, xW, alpha, R, xiF, yiF, max_stages=500):
+    """
+    Step off the equilibrium stages of all designs at once, from the distillate down, as
+    in the notebook's stage construction: from (x, y) on an operating line to the
+    equilibrium liquid at the same y, and back to the rectifying line above xiF or the
+    stripping line below it. Designs that have reached xW drop out of the iteration.
+
+    Returns the number of stages and the feed stage (the first stage, counted from the
+    top, whose liquid is below xiF); both are inf for designs that do not reach xW
+    within max_stages (pinched at or below the minimum reflux).
+    """
+    xD, xW, alpha, R, xiF, yiF = np.broadcast_arrays(*(np.asarray(array, dtype=float)
+                                                       for array in (xD, xW, alpha, R, xiF, yiF)))
+    shape = xD.shape
+    xD, xW, alpha, R, xiF, yiF = (array.ravel() for array in (xD, xW, alpha, R, xiF, yiF))
+    rectifying_slope, rectifying_intercept = R / (R + 1), xD / (R + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stripping_slope = (yiF - xW) / (xiF - xW)
+
+    stages = np.full(xD.size, np.inf)
+    feed_stage = np.full(xD.size, np.inf)
+    active = np.flatnonzero(np.isfinite(xiF) & np.isfinite(stripping_slope))
+    y = xD[active]
+    for stage in range(1, max_stages + 1):
+        x = equilibrium_x(y, alpha[active])
+        below_feed = x < xiF[active]
+        feed_stage[active[below_feed & np.isinf(feed_stage[active])]] = stage
+        done = x < xW[active]
+        stages[active[done]] = stage
+        keep = ~done
+        active, x, below_feed = active[keep], x[keep], below_feed[keep]
+        if not active.size:
+            break
+        y = np.where(below_feed,
+                     stripping_slope[active] * (x - xW[active]) + xW[active],
+                     rectifying_slope[active] * x + rectifying_intercept[active])
+    feed_stage[np.isinf(stages)] = np.inf
+    return stages.reshape(shape), feed_stage.reshape(shape)
+
+
+def mccabe_thiele(xF, xD, xW, alpha, q, R=None, reflux_factor=1.5, max_stages=500):
+    """
+    McCabe-Thiele design of binary columns, vectorized over designs: the minimum reflux,
+    the reflux (R, or reflux_factor times the minimum as in the notebook when R is
+    None), the q-line pinch and feed points, and the numbers of stages and feed stage.
+    reflux_factor presumes a positive minimum reflux, i.e. xD above the pinch point.
+    Arguments are arrays or scalars broadcast against each other. Returns a DataFrame
+    with one row per design.
+    """
+    R = np.nan if R is None else R
+    xF, xD, xW, alpha, q, R, reflux_factor = (array.ravel() for array in np.broadcast_arrays(
+        *(np.asarray(array, dtype=float) for array in (xF, xD, xW, alpha, q, R, reflux_factor))))
+    xiE, yiE = feed_intersection(xF, q, alpha)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        R_min = minimum_reflux(xD, xiE, yiE)
+        R = np.where(np.isnan(R), reflux_factor * R_min, R)
+        xiF, yiF = feed_point(xF, xD, R, q)
+    stages, feed_stage = step_stages(xD, xW, alpha, R, xiF, yiF, max_stages)
+    return pd.DataFrame({'xF': xF, 'xD': xD, 'xW': xW, 'alpha': alpha, 'q': q, 'R_min': R_min, 'R': R,
+                         'xiE': xiE, 'yiE': yiE, 'xiF': xiF, 'yiF': yiF,
+                         'stages': stages, 'feed_stage': feed_stage})
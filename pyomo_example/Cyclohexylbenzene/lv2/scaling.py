@@ -0,0 +1,79 @@
+import numpy as np
+from pyomo.environ import Var, Constraint, Objective, Suffix
+from pyomo.core.expr.calculus.derivatives import differentiate, Modes
+from pyomo.core.expr.visitor import identify_variables
+
+
+def _nominal(var):
+    """Typical magnitude of a variable: its value, else its largest finite bound, else 1."""
+    if var.value:
+        return abs(var.value)
+    bounds = [abs(bound) for bound in (var.lb, var.ub) if bound is not None and bound != 0]
+    return max(bounds) if bounds else 1.0
+
+
+def _row_magnitude(expr, nominal):
+    """Largest term |d expr/d v| * nominal(v) of an expression, evaluated at the nominal point."""
+    variables = list(identify_variables(expr, include_fixed=False))
+    if not variables:
+        return None
+    start = [var.value for var in variables]
+    for var in variables:
+        var.set_value(nominal[id(var)] if var.value is None else var.value, skip_validation=True)
+    try:
+        gradient = differentiate(expr, wrt_list=variables, mode=Modes.reverse_numeric)
+        magnitude = max(abs(g) * nominal[id(var)] for g, var in zip(gradient, variables))
+    except (ArithmeticError, ValueError):
+        magnitude = None
+    finally:
+        for var, var_value in zip(variables, start):
+            var.set_value(var_value, skip_validation=True)
+    return magnitude if magnitude and np.isfinite(magnitude) else None
+
+
+def set_scaling_factors(model, min_factor=1e-6, max_factor=1e6):
+    """
+    Fill the model's scaling_factor suffix (as read by the core.scale_model transformation)
+    from nominal values and the balance structure.
+
+    Every free variable is scaled by 1/nominal, with the nominal taken from its current
+    value or its bounds, so flows of hundreds of kmol/h and mole fractions both become
+    of order one. Every constraint and the objective are then scaled by the inverse of
+    their largest term at the nominal point, i.e. a balance row by its largest scaled
+    flow. Factors are clipped to [min_factor, max_factor].
+    """
+    if not hasattr(model, 'scaling_factor'):
+        model.scaling_factor = Suffix(direction=Suffix.EXPORT)
+    scaling_factor = model.scaling_factor
+
+    nominal = {}
+    for var in model.component_data_objects(Var):
+        if var.fixed:
+            continue
+        nominal[id(var)] = _nominal(var)
+        scaling_factor[var] = float(np.clip(1.0 / nominal[id(var)], min_factor, max_factor))
+
+    rows = ([(constraint, constraint.body) for constraint in model.component_data_objects(Constraint, active=True)] +
+            [(objective, objective.expr) for objective in model.component_data_objects(Objective, active=True)])
+    for component, expr in rows:
+        magnitude = _row_magnitude(expr, nominal)
+        if magnitude is not None:
+            scaling_factor[component] = float(np.clip(1.0 / magnitude, min_factor, max_factor))
+    return scaling_factor
+
+
+def propagate_solution(scaling, scaled, model):
+    """
+    scaling.propagate_solution(scaled, model), for solutions that leave variables without
+    a value: the solver does not return variables in no active constraint, which are
+    unset in the original model as well and stay so.
+    """
+    unset = [var for var in scaled.component_data_objects(Var) if var.value is None]
+    for var in unset:
+        var.set_value(0, skip_validation=True)
+    scaling.propagate_solution(scaled, model)
+    names = scaled.scaled_component_to_original_name_map
+    for var in unset:
+        var.set_value(None)
+        model.find_component(names[var.parent_component()])[var.index()].set_value(None)
+
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from pyomo.environ import Constraint, Objective, value, minimize
+from pyomo.common.collections import ComponentMap
+from pyomo.common.numeric_types import native_numeric_types
+from pyomo.core.expr.visitor import identify_variables, identify_mutable_parameters
+from pyomo.core.expr.calculus.derivatives import differentiate, Modes
+
+
+def _derivatives(expr, wrt):
+    """Gradient and Hessian of expr with respect to the wrt list, at the current point."""
+    n = len(wrt)
+    gradient = np.zeros(n)
+    hessian = np.zeros((n, n))
+    for i, derivative in enumerate(differentiate(expr, wrt_list=wrt, mode=Modes.reverse_symbolic)):
+        if type(derivative) in native_numeric_types:
+            gradient[i] = derivative
+            continue
+        gradient[i] = value(derivative)
+        hessian[i] = differentiate(derivative, wrt_list=wrt, mode=Modes.reverse_numeric)
+    return gradient, hessian
+
+
+def _active_constraints(model, tolerance):
+    """Residual expressions of the equality constraints and of the active inequalities."""
+    residuals = []
+    for c in model.component_data_objects(Constraint, active=True):
+        if c.equality:
+            residuals.append((c, c.body - c.upper))
+        elif c.has_ub() and abs(value(c.body) - value(c.upper)) <= tolerance:
+            residuals.append((c, c.body - c.upper))
+        elif c.has_lb() and abs(value(c.body) - value(c.lower)) <= tolerance:
+            residuals.append((c, c.body - c.lower))
+    return residuals
+
+
+def kkt_sensitivity(model, parameters, tolerance=1e-8):
+    """
+    First-order sensitivities of a converged solution with respect to mutable parameters.
+
+    Differentiates the KKT conditions of the active set at the current point,
+        [H  J'] [dx/dp]     [H_xp]
+        [J  0 ] [dl/dp] = - [J_p ],
+    where J is the Jacobian of the equality (and active inequality) constraints and H the
+    Hessian of the Lagrangian f + l'c. Variables that are fixed or within tolerance of a
+    bound are held constant, i.e. the active set is assumed not to change. The multipliers
+    l are the least-squares solution of grad f + J'l = 0 at the current point. Without an
+    active objective this reduces to the implicit function theorem on c(x, p) = 0.
+
+    Returns (dx_dp, dobj_dp): a DataFrame indexed by variable name with one column per
+    parameter, and a Series of objective derivatives (envelope theorem), None without
+    an objective.
+    """
+    parameters = list(parameters)
+    names = [p.name for p in parameters]
+    residuals = _active_constraints(model, tolerance)
+    objective = next(model.component_data_objects(Objective, active=True), None)
+
+    # Free variables of the active system, in order of appearance
+    variables = ComponentMap()
+    expressions = [expr for _, expr in residuals] + ([objective.expr] if objective is not None else [])
+    for expr in expressions:
+        for var in identify_variables(expr, include_fixed=False):
+            if var in variables:
+                continue
+            at_bound = ((var.has_lb() and abs(var.value - value(var.lb)) <= tolerance) or
+                        (var.has_ub() and abs(var.value - value(var.ub)) <= tolerance))
+            if not at_bound:
+                variables[var] = len(variables)
+    n, m, k = len(variables), len(residuals), len(parameters)
+    columns = ComponentMap((p, n + j) for j, p in enumerate(parameters))
+
+    def local_derivatives(expr):
+        wrt = ([var for var in identify_variables(expr, include_fixed=False) if var in variables] +
+               [p for p in identify_mutable_parameters(expr) if p in columns])
+        index = np.array([variables[v] if v in variables else columns[v] for v in wrt], dtype=int)
+        gradient, hessian = _derivatives(expr, wrt)
+        return index, gradient, hessian
+
+    # Objective gradient and Hessian, as a minimization
+    sign = 1.0
+    grad_f = np.zeros(n + k)
+    hess_f = np.zeros((n + k, n + k))
+    if objective is not None:
+        sign = 1.0 if objective.sense == minimize else -1.0
+        index, gradient, hessian = local_derivatives(objective.expr)
+        grad_f[index] = sign * gradient
+        hess_f[np.ix_(index, index)] = sign * hessian
+
+    # Constraint Jacobian (with parameter columns) and Hessians
+    jacobian = np.zeros((m, n + k))
+    constraint_hessians = []
+    for row, (_, expr) in enumerate(residuals):
+        index, gradient, hessian = local_derivatives(expr)
+        jacobian[row, index] = gradient
+        constraint_hessians.append((index, hessian))
+
+    J, J_p = jacobian[:, :n], jacobian[:, n:]
+    multipliers = np.linalg.lstsq(J.T, -grad_f[:n], rcond=None)[0] if objective is not None else np.zeros(m)
+
+    hess_L = hess_f.copy()
+    for multiplier, (index, hessian) in zip(multipliers, constraint_hessians):
+        if multiplier != 0.0:
+            hess_L[np.ix_(index, index)] += multiplier * hessian
+
+    kkt = np.block([[hess_L[:n, :n], J.T], [J, np.zeros((m, m))]])
+    rhs = -np.vstack([hess_L[:n, n:], J_p])
+    solution, _, rank, _ = np.linalg.lstsq(kkt, rhs, rcond=None)
+    if rank < n + m:
+        print(f"Warning: KKT matrix is singular (rank {rank} of {n + m}); "
+              f"minimum-norm sensitivities are returned.")
+
+    dx_dp = pd.DataFrame(solution[:n], index=[var.name for var in variables], columns=names)
+    dobj_dp = None
+    if objective is not None:
+        dobj_dp = pd.Series(sign * (grad_f[n:] + multipliers @ J_p), index=names)
+    return dx_dp, dobj_dp
@@ -0,0 +1,233 @@
+import numpy as np
+from scipy.optimize import root, least_squares
+from pyomo.environ import SolverFactory, value
+from pyomo.common.collections import ComponentSet
+from pyomo.contrib.incidence_analysis import IncidenceGraphInterface
+from pyomo.core.expr.calculus.derivatives import differentiate
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.repn import generate_standard_repn
+from pyomo.util.calc_var_value import calculate_variable_from_constraint
+from pyomo.util.subsystems import create_subsystem_block, TemporarySubsystemManager
+from telemetry import max_infeasibility
+
+
+def _violation(constraint):
+    """Amount by which a constraint is violated at the current values (inf if it cannot be evaluated)."""
+    try:
+        body = value(constraint.body, exception=False)
+    except (ArithmeticError, ValueError):
+        return np.inf
+    if body is None:
+        return np.inf
+    lower = -np.inf if constraint.lower is None else value(constraint.lower)
+    upper = np.inf if constraint.upper is None else value(constraint.upper)
+    return max(lower - body, body - upper, 0.0)
+
+
+def _names(components, limit=10):
+    names = [component.name for component in components]
+    return ', '.join(names[:limit]) + (f', ... ({len(names) - limit} more)' if len(names) > limit else '')
+
+
+class UnitStep:
+    """
+    One diagonal block of the block-triangular form of the flowsheet equations: a square
+    set of equations solved for its unknowns, with the variables of earlier steps (and
+    the specifications) held at their values.
+
+    Steps that are linear in their unknowns are compiled once into coefficient and
+    constant expressions (which may contain parameters and values of earlier steps),
+    and each evaluation solves A x = b directly; the solution is only accepted if it
+    satisfies the equations. Otherwise, and for nonlinear steps, a single equation is
+    solved with calculate_variable_from_constraint and larger steps with Powell's hybrid
+    method (MINPACK, scipy's root) on the symbolic Jacobian; ipopt on a subsystem block
+    of the step alone is the last resort.
+
+    Only with least_squares may a step have more equations than unknowns; it is then
+    solved in the least-squares sense within the variable bounds, and never satisfies
+    its equations unless they are consistent.
+    """
+
+    def __init__(self, name, constraints, unknowns, solver, tolerance=1e-8, least_squares=False):
+        if len(constraints) != len(unknowns) and not (least_squares and len(constraints) > len(unknowns)):
+            raise ValueError(f"Step {name} is not square: {len(constraints)} equations, {len(unknowns)} unknowns.")
+        self.name = name
+        self.least_squares = least_squares
+        self.constraints = constraints
+        self.unknowns = unknowns
+        self.solver = solver
+        self.tolerance = tolerance
+        self.residual = 0.0
+
+        columns = {id(var): j for j, var in enumerate(unknowns)}
+        inputs = ComponentSet(var for constraint in constraints
+                              for var in identify_variables(constraint.body, include_fixed=False)
+                              if id(var) not in columns)
+        with TemporarySubsystemManager(to_fix=list(inputs)):
+            repns = [generate_standard_repn(c.body, compute_values=False) for c in constraints]
+        self.linear = all(repn.is_linear() for repn in repns) and not least_squares
+
+        if self.linear:
+            # Rows of (columns, coefficients, constant, right-hand side); the expressions are
+            # evaluated at every call, so changed parameters and upstream values are picked up
+            self.rows = [([columns[id(var)] for var in repn.linear_vars], list(repn.linear_coefs),
+                          repn.constant, c.upper)
+                         for c, repn in zip(constraints, repns)]
+        else:
+            self.residuals = [c.body - c.upper for c in constraints]
+            self.jacobian = [differentiate(residual, wrt_list=unknowns, mode=differentiate.Modes.reverse_symbolic)
+                             for residual in self.residuals]
+        self.block = create_subsystem_block(constraints, unknowns) if len(unknowns) > 1 else None
+
+    def __repr__(self):
+        kind = 'least squares' if self.least_squares else 'linear' if self.linear else 'nonlinear'
+        return f"UnitStep({self.name}, {len(self.constraints)} equations, {len(self.unknowns)} unknowns, {kind})"
+
+    def evaluate(self):
+        if self.least_squares:
+            self._solve_least_squares()
+            self.residual = max(_violation(constraint) for constraint in self.constraints)
+            return
+        solved = self._solve_linear() if self.linear else False
+        try:
+            if not solved and self.block is None:
+                calculate_variable_from_constraint(self.unknowns[0], self.constraints[0])
+                solved = True
+            if not solved and not self.linear:
+                solved = self._solve_nonlinear()
+            if not solved and self.block is not None and self.solver.available(exception_flag=False):
+                with TemporarySubsystemManager(to_fix=list(self.block.input_vars.values())):
+                    self.solver.solve(self.block)
+        except (ArithmeticError, ValueError, RuntimeError):  # Reported through the residual
+            pass
+        self.residual = max(_violation(constraint) for constraint in self.constraints)
+
+    def _set(self, x):
+        for var, var_value in zip(self.unknowns, x):
+            var.set_value(float(var_value), skip_validation=True)
+
+    def _solve_linear(self):
+        """Solve the step as A x = b. Returns False if the solution does not satisfy the equations."""
+        A = np.zeros((len(self.rows), len(self.unknowns)))
+        b = np.empty(len(self.rows))
+        try:
+            for row, (columns, coefficients, constant, rhs) in enumerate(self.rows):
+                A[row, columns] = [value(coefficient) for coefficient in coefficients]
+                b[row] = value(rhs) - value(constant)
+            x = np.linalg.solve(A, b)
+        except (ArithmeticError, ValueError, np.linalg.LinAlgError):  # Inputs without value, or singular
+            return False
+        if not np.all(np.isfinite(x)) or np.max(np.abs(A @ x - b)) > self.tolerance * max(1.0, np.max(np.abs(b))):
+            return False
+        self._set(x)
+        return True
+
+    def _solve_nonlinear(self):
+        """Solve the step with scipy's root. Returns False if it did not converge."""
+        start = [var.value if var.value is not None else 0.0 for var in self.unknowns]
+
+        def residuals(x):
+            self._set(x)
+            return [value(residual) for residual in self.residuals]
+
+        def jacobian(x):
+            self._set(x)
+            return [[value(derivative) for derivative in row] for row in self.jacobian]
+
+        with np.errstate(all='ignore'):
+            solution = root(residuals, start, jac=jacobian, method='hybr')
+        if solution.success and np.all(np.isfinite(solution.x)):
+            self._set(solution.x)
+            return True
+        self._set(start)
+        return False
+
+    def _solve_least_squares(self):
+        lower = np.array([-np.inf if var.lb is None else var.lb for var in self.unknowns])
+        upper = np.array([np.inf if var.ub is None else var.ub for var in self.unknowns])
+        # Start strictly inside the bounds (the trust-region reflective method needs it)
+        margin = 1e-3 * np.minimum(1.0, np.where(np.isfinite(upper - lower), upper - lower, 1.0))
+        start = np.clip([var.value if var.value is not None else 0.0 for var in self.unknowns],
+                        lower + margin, upper - margin)
+
+        def residuals(x):
+            self._set(x)
+            return [value(residual) for residual in self.residuals]
+
+        def jacobian(x):
+            self._set(x)
+            return [[value(derivative) for derivative in row] for row in self.jacobian]
+
+        with np.errstate(all='ignore'):
+            try:
+                solution = least_squares(residuals, start, jac=jacobian, bounds=(lower, upper))
+            except (ArithmeticError, ValueError):
+                self._set(start)
+                return
+        self._set(solution.x)
+
+
+class SequentialModular:
+    """
+    Sequential-modular evaluation of a torn flowsheet.
+
+    The caller tears the recycle first (ChemicalModel._tear_model replaces the tear
+    streams by guess parameters in the constraints consuming them), so the unit that
+    produces a tear stream recomputes it from the guesses. With the variables in specs
+    held at their values, the active equality constraints and their free variables must
+    then form a square, structurally nonsingular system. Its block-triangular
+    decomposition gives the calculation order: one square UnitStep per diagonal block,
+    each evaluated after the steps it depends on.
+
+    A system that is not square (its Dulmage-Mendelsohn decomposition leaves equations
+    or variables unmatched) raises a ValueError naming the surplus equations and the
+    variables that need specifications. With square=False, as for initialization, the
+    decomposition is used instead: the overdetermined part is evaluated first as one
+    least-squares step (its equations listed in overdetermined), then the square part
+    block by block, then the underdetermined part with its unmatched variables held at
+    their current values (listed in held).
+
+    evaluate() makes one pass through the flowsheet, recomputing the tear streams from
+    the current guesses (variables without a value start at 0); converging them is left
+    to a TearSolver.
+    """
+
+    def __init__(self, model, specs=(), square=True, solver='ipopt'):
+        self.model = model
+        self.solver = SolverFactory(solver)
+        with TemporarySubsystemManager(to_fix=list(specs)):
+            graph = IncidenceGraphInterface(model, include_inequality=False)
+            var_partition, con_partition = graph.dulmage_mendelsohn()
+            self.variables = list(graph.variables)
+            self.held = list(var_partition.unmatched)
+            self.overdetermined = list(con_partition.overconstrained) + list(con_partition.unmatched)
+            if square and (var_partition.unmatched or con_partition.unmatched):
+                raise ValueError(
+                    f"The torn flowsheet is not a square system at the specifications [{_names(specs)}]: "
+                    f"{len(con_partition.unmatched)} equations are structurally surplus "
+                    f"({_names(con_partition.unmatched)}) and {len(self.held)} variables need "
+                    f"specifications ({_names(self.held)}).")
+            blocks = []
+            for variables, constraints in [(var_partition.square, con_partition.square),
+                                           (var_partition.underconstrained, con_partition.underconstrained)]:
+                if constraints:
+                    blocks.extend(zip(*graph.block_triangularize(variables, constraints)))
+
+        self.steps = []
+        if var_partition.overconstrained:
+            self.steps.append(UnitStep('overdetermined', self.overdetermined, list(var_partition.overconstrained),
+                                       self.solver, least_squares=True))
+        for index, (variables, constraints) in enumerate(blocks):
+            name = f'block {index}: {constraints[0].name}' + (f' (+{len(constraints) - 1})' if len(constraints) > 1 else '')
+            self.steps.append(UnitStep(name, constraints, variables, self.solver))
+        self.residual = None
+
+    def evaluate(self):
+        """One pass through the flowsheet in calculation order. Returns the largest constraint violation."""
+        for var in self.variables:
+            if var.value is None:
+                var.set_value(0.0, skip_validation=True)
+        for step in self.steps:
+            step.evaluate()
+        self.residual = max_infeasibility(self.model)
+        return self.residual
@@ -0,0 +1,142 @@
+import itertools
+import networkx as nx
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, milp
+from pyomo.environ import Constraint
+from pyomo.common.collections import ComponentMap
+from pyomo.core.expr.relational_expr import EqualityExpression
+from pyomo.core.expr.visitor import identify_variables
+
+
+class FlowsheetGraph:
+    """
+    Stream graph of a flowsheet, derived from its component balance equations.
+
+    The lv2 models write every unit balance as inlets == outlets, e.g.
+    s10[c] == s11[c] + s12[c] or FR * s12[c] == s15[c]. Every equality with component
+    flows on both sides gives edges from its left-hand (inlet) streams to its right-hand
+    (outlet) streams. Equalities that only relate streams leaving the same unit (split
+    specifications such as s13[c] == 5 * s14[c]) are not balances.
+
+    Units are the groups of streams entering the same balances. Variables other than
+    stream variables (extents of reaction, conversion) belong to the unit of the
+    balances they appear in, and so do the other constraints containing them.
+    """
+
+    def __init__(self, model, component_flows, stream_variables):
+        self.model = model
+        self.component_flows = component_flows    # ComponentMap: component flow Var -> stream
+        self.stream_variables = stream_variables  # ComponentMap: any stream Var -> stream
+        self.graph = nx.DiGraph()
+        self.balances = {}                        # constraint name -> (inlets, outlets)
+        self.constraint_unit = {}                 # constraint name -> unit (frozenset of inlets)
+        self._build()
+
+    def _side_streams(self, expr):
+        return {self.component_flows[var] for var in identify_variables(expr) if var in self.component_flows}
+
+    def _build(self):
+        candidates = []
+        for constraint in self.model.component_data_objects(Constraint, active=True):
+            if not isinstance(constraint.expr, EqualityExpression):
+                continue
+            lhs, rhs = constraint.expr.args
+            inlets, outlets = self._side_streams(lhs), self._side_streams(rhs)
+            if inlets and outlets:
+                candidates.append((constraint, inlets, outlets))
+
+        siblings = {frozenset(pair) for _, _, outlets in candidates for pair in itertools.combinations(outlets, 2)}
+        inlet_groups = nx.Graph()
+        for constraint, inlets, outlets in candidates:
+            edges = [(a, b) for a in inlets for b in outlets if a != b and frozenset((a, b)) not in siblings]
+            if not edges:
+                continue  # Split specification
+            self.balances[constraint.name] = (inlets, outlets)
+            self.graph.add_edges_from(edges)
+            inlet_groups.add_edges_from(itertools.combinations(sorted(inlets), 2))
+            inlet_groups.add_nodes_from(inlets)
+
+        # Units: connected groups of inlet streams
+        unit_of_inlet = {}
+        for group in nx.connected_components(inlet_groups):
+            for stream in group:
+                unit_of_inlet[stream] = frozenset(group)
+        self.units = set(unit_of_inlet.values())
+
+        unit_of_var = ComponentMap()
+        for name, (inlets, _) in self.balances.items():
+            unit = unit_of_inlet[next(iter(inlets))]
+            self.constraint_unit[name] = unit
+            for var in identify_variables(self.model.find_component(name).body):
+                if var not in self.stream_variables:
+                    unit_of_var[var] = unit
+
+        for constraint in self.model.component_data_objects(Constraint, active=True):
+            if constraint.name in self.constraint_unit:
+                continue
+            for var in identify_variables(constraint.body):
+                if var in unit_of_var:
+                    self.constraint_unit[constraint.name] = unit_of_var[var]
+                    break
+
+    def cycles(self):
+        """Recycle loops as lists of streams (Johnson's algorithm)."""
+        return [sorted(cycle) for cycle in nx.simple_cycles(self.graph)]
+
+    def select_tears(self, weights=None):
+        """
+        Minimum-weight set of streams that breaks every recycle loop. weights maps a
+        stream to its (positive) cost, default 1, i.e. fewest tear streams; ties are broken
+        by the fewest loops torn more than once, then by the lowest stream numbers.
+
+        Solved as a set-covering integer program (one binary per stream, one covering
+        row per loop) with HiGHS: one solve per criterion, then one feasibility solve per
+        candidate stream to fix the ties, instead of enumerating the stream subsets. The
+        cost is then dominated by listing the loops (Johnson's algorithm, linear in their
+        number), which stays small for flowsheets but grows quickly in densely connected
+        graphs.
+        """
+        cycles = [set(cycle) for cycle in self.cycles()]
+        if not cycles:
+            return []
+        weights = weights or {}
+        candidates = sorted(set().union(*cycles))
+        n = len(candidates)
+        loops = np.array([[stream in cycle for stream in candidates] for cycle in cycles], dtype=float)
+        constraints = [LinearConstraint(loops, lb=1)]
+        lower, upper = np.zeros(n), np.ones(n)
+
+        def solve(cost):
+            return milp(cost, constraints=constraints, integrality=np.ones(n), bounds=Bounds(lower, upper),
+                        options={'mip_rel_gap': 0})
+
+        # Lowest weight, then the fewest loops torn more than once (a stream counts once
+        # per loop it is in); the optimum of each criterion is kept while the next is minimized
+        for cost in (np.array([weights.get(stream, 1) for stream in candidates], dtype=float), loops.sum(axis=0)):
+            result = solve(cost)
+            if not result.success:
+                raise RuntimeError(f"Tear selection failed: {result.message}")
+            constraints.append(LinearConstraint(cost, ub=result.fun + 1e-9 * max(1.0, abs(result.fun))))
+        # Among the optimal sets, take each stream in increasing order whenever possible
+        for j in range(n):
+            lower[j] = 1
+            if not solve(np.zeros(n)).success:
+                lower[j] = upper[j] = 0
+        return [stream for stream, tear in zip(candidates, lower) if tear]
+
+    def consumers(self, tears):
+        """
+        Constraints in which the tear streams enter a unit: the balances of every unit
+        with a tear stream as inlet, and that unit's other constraints containing it.
+        """
+        tears = set(tears)
+        names = []
+        for constraint in self.model.component_data_objects(Constraint, active=True):
+            unit = self.constraint_unit.get(constraint.name)
+            if unit is None:
+                continue
+            streams = {self.component_flows[var] for var in identify_variables(constraint.body)
+                       if var in self.component_flows}
+            if streams & tears & unit:
+                names.append(constraint.name)
+        return names
@@ -0,0 +1,224 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+from pyomo.environ import Var
+from chemical_model import ChemicalModel
+
+
+class RunningMoments:
+    """Streaming mean and variance of arrays (Welford's algorithm), elementwise."""
+
+    def __init__(self, shape):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self):
+        """Sample variance (NaN with fewer than two observations)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else np.full_like(self.mean, np.nan)
+
+
+class RunningQuantiles:
+    """
+    Streaming estimates of quantiles of arrays, elementwise, with the P-square
+    algorithm (Jain and Chlamtac, 1985): five markers per quantile whose heights are
+    adjusted by piecewise-parabolic interpolation as observations arrive, so memory does
+    not grow with their number. Exact for the first five observations.
+    """
+
+    def __init__(self, shape, probabilities=(0.05, 0.5, 0.95)):
+        self.probabilities = list(probabilities)
+        self.count = 0
+        self._first = []
+        p = np.array(self.probabilities)[:, None]
+        # Marker heights q, positions n and desired positions (quantiles x 5 markers x cells),
+        # and the increments of the desired positions per observation
+        self._increments = np.hstack([np.zeros_like(p), p / 2, p, (1 + p) / 2, np.ones_like(p)])
+        self._shape = shape
+        self._q = self._n = self._desired = None
+
+    def update(self, x):
+        x = np.ravel(x)
+        self.count += 1
+        if self.count <= 5:
+            self._first.append(x)
+            if self.count == 5:
+                heights = np.sort(np.array(self._first), axis=0)
+                self._q = np.repeat(heights[None], len(self.probabilities), axis=0)
+                self._n = np.tile(np.arange(5.0)[:, None], (len(self.probabilities), 1, x.size))
+                self._desired = 4 * self._increments[:, :, None] + np.zeros(x.size)
+                self._first = []
+            return
+
+        q, n = self._q, self._n
+        # Cell k of x, extending the extreme markers to it where needed
+        q[:, 0] = np.minimum(q[:, 0], x)
+        q[:, 4] = np.maximum(q[:, 4], x)
+        k = np.clip((x >= q[:, 1:4]).sum(axis=1), 0, 3)
+        n += (np.arange(5)[None, :, None] > k[:, None, :])
+        self._desired += self._increments[:, :, None]
+
+        for i in (1, 2, 3):
+            d = self._desired[:, i] - n[:, i]
+            move = ((d >= 1) & (n[:, i + 1] - n[:, i] > 1)) | ((d <= -1) & (n[:, i - 1] - n[:, i] < -1))
+            if not move.any():
+                continue
+            s = np.sign(d)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                parabolic = q[:, i] + s / (n[:, i + 1] - n[:, i - 1]) * (
+                    (n[:, i] - n[:, i - 1] + s) * (q[:, i + 1] - q[:, i]) / (n[:, i + 1] - n[:, i])
+                    + (n[:, i + 1] - n[:, i] - s) * (q[:, i] - q[:, i - 1]) / (n[:, i] - n[:, i - 1]))
+                neighbour = np.where(s > 0, q[:, i + 1], q[:, i - 1])
+                neighbour_n = np.where(s > 0, n[:, i + 1], n[:, i - 1])
+                linear = q[:, i] + s * (neighbour - q[:, i]) / (neighbour_n - n[:, i])
+            inside = (q[:, i - 1] < parabolic) & (parabolic < q[:, i + 1])
+            q[:, i] = np.where(move, np.where(inside, parabolic, linear), q[:, i])
+            n[:, i] = np.where(move, n[:, i] + s, n[:, i])
+
+    @property
+    def quantiles(self):
+        """Array (quantiles x shape) of the current estimates."""
+        if self._q is not None:
+            estimates = self._q[:, 2]
+        elif self._first:
+            estimates = np.quantile(np.array(self._first), self.probabilities, axis=0)
+        else:
+            estimates = np.full((len(self.probabilities), int(np.prod(self._shape))), np.nan)
+        return estimates.reshape((len(self.probabilities),) + tuple(self._shape))
+
+
+# Flowsheet owned by each sampling worker process, and its starting point
+_worker_flowsheet = None
+_worker_start_point = None
+
+
+def _init_sampling_worker(model_options):
+    """Build one ChemicalModel per worker process and solve the nominal case as starting point."""
+    global _worker_flowsheet, _worker_start_point
+    _worker_flowsheet = ChemicalModel(use_cache=False, **model_options)
+    try:
+        _worker_flowsheet.solve()
+    except Exception as error:  # Samples then start from the initial values
+        print(f"Nominal solve failed: {error}")
+    _worker_start_point = [(var, var.value) for var in _worker_flowsheet.model.component_data_objects(Var)]
+
+
+def _solve_sample(index, parameters):
+    """Solve one sample. Returns its stream table flows, or None, and the termination condition."""
+    flowsheet = _worker_flowsheet
+    for var, var_value in _worker_start_point:
+        var.set_value(var_value, skip_validation=True)
+    for name, parameter_value in parameters.items():
+        flowsheet.model.params[name].set_value(parameter_value)
+    try:
+        with flowsheet.telemetry.tagged(caller='monte_carlo', sample=index):
+            flowsheet.solve(use_cache=False)
+    except Exception as error:  # A failed solve only drops this sample
+        return index, None, f'error: {error}'
+    termination = str(flowsheet.results.solver.termination_condition)
+    if termination not in ('optimal', 'locallyOptimal'):
+        return index, None, termination
+    return index, flowsheet.stream_table().flows, termination
+
+
+class UncertaintyStudy:
+    """
+    Monte Carlo and quasi-Monte Carlo propagation of parameter uncertainty through the
+    flowsheet.
+
+    distributions maps parameter names to frozen scipy.stats distributions, e.g.
+        UncertaintyStudy({'S15_Methane': stats.norm(0.8657, 0.01),
+                          'FR_S19_LK': stats.uniform(0.98, 0.015)})
+    Samples are drawn by inverse transform from a pseudo-random ('random') or scrambled
+    Sobol or Halton ('sobol', 'halton') sequence, lazily in batches, and solved in a pool
+    of worker processes that each own a ChemicalModel warm-started from the nominal
+    solution. Only converged samples enter the statistics: the mean and variance
+    (Welford) and quantiles (P-square) of every stream table flow, updated as results
+    arrive, so memory stays constant in the number of samples.
+    """
+
+    def __init__(self, distributions, sampler='sobol', quantiles=(0.05, 0.5, 0.95), seed=None,
+                 indexed=False, reduced=False):
+        if sampler not in ('random', 'sobol', 'halton'):
+            raise ValueError(f"Unknown sampler '{sampler}'. Choose from 'random', 'sobol' or 'halton'.")
+        self.distributions = dict(distributions)
+        self.sampler = sampler
+        self.probabilities = list(quantiles)
+        self.seed = seed
+        self.model_options = {'indexed': indexed, 'reduced': reduced}
+        self.moments = None
+        self.quantiles = None
+        self.terminations = {}  # Termination condition -> number of samples
+        self.streams = self.components = None
+
+    def _samples(self, count, batch_size=1024):
+        """Parameter dictionaries of count samples, drawn batch_size at a time."""
+        names = list(self.distributions)
+        if self.sampler == 'random':
+            engine = np.random.default_rng(self.seed)
+            draw = lambda n: engine.random((n, len(names)))
+        else:
+            engine = (qmc.Sobol if self.sampler == 'sobol' else qmc.Halton)(len(names), scramble=True, seed=self.seed)
+            draw = engine.random
+        drawn = 0
+        while drawn < count:
+            n = min(batch_size, count - drawn)
+            uniform = draw(n)
+            values = np.column_stack([self.distributions[name].ppf(uniform[:, j]) for j, name in enumerate(names)])
+            for row in values:
+                yield dict(zip(names, map(float, row)))
+            drawn += n
+
+    def run(self, samples=1024, max_workers=None, max_pending=None):
+        """
+        Solve samples samples, keeping at most max_pending (default four per worker) in
+        flight, and return the summary.
+        """
+        reference = ChemicalModel(use_cache=False, **self.model_options)
+        table = reference.stream_table()
+        self.streams, self.components = table.streams, table.components
+        self.moments = RunningMoments(table.flows.shape)
+        self.quantiles = RunningQuantiles(table.flows.shape, self.probabilities)
+        self.terminations = {}
+
+        max_workers = max_workers or os.cpu_count()
+        max_pending = max_pending or 4 * max_workers
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sampling_worker,
+                                 initargs=(self.model_options,)) as executor:
+            pending = set()
+            for index, parameters in enumerate(self._samples(samples)):
+                pending.add(executor.submit(_solve_sample, index, parameters))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done)
+            self._collect(pending)
+
+        converged = self.moments.count
+        print(f"Uncertainty study: {converged} of {samples} samples converged "
+              f"({', '.join(f'{count} {termination}' for termination, count in self.terminations.items())})")
+        return self.summary()
+
+    def _collect(self, futures):
+        for future in futures:
+            _, flows, termination = future.result()
+            self.terminations[termination] = self.terminations.get(termination, 0) + 1
+            if flows is not None:
+                self.moments.update(flows)
+                self.quantiles.update(flows)
+
+    def summary(self):
+        """Mean, standard deviation and quantiles of every flow, indexed by (stream, component)."""
+        index = pd.MultiIndex.from_product([self.streams, self.components], names=['stream', 'component'])
+        columns = {'mean': self.moments.mean.ravel(), 'std': np.sqrt(self.moments.variance).ravel()}
+        for probability, estimate in zip(self.probabilities, self.quantiles.quantiles):
+            columns[f'q{probability:g}'] = estimate.ravel()
+        return pd.DataFrame(columns, index=index)
@@ -1,7 +1,9 @@
-from pyomo.environ import Var, NonNegativeReals, RangeSet
+from pyomo.environ import Var, Expression, NonNegativeReals, RangeSet
 
 class Variables:
-    def __init__(self, model, components, parameters):
+    def __init__(self, model, components, parameters, indexed=False, reduced=False):
+        self.indexed = indexed
+        self.reduced = reduced
         self.define_variables(model, components, parameters)
 
     def define_variables(self, model, components, parameters):
@@ -9,19 +11,45 @@ class Variables:
         # Define a set for the streams
         model.streams = RangeSet(19, 39)
 
-        for i in model.streams:
-            # Overall Stream molar flow rates
-            setattr(model, f'S{i}', Var(within=NonNegativeReals, initialize=5))
+        if self.indexed:
+            self._define_indexed_stream_variables(model, components, 5, 5)
+        else:
+            for i in model.streams:
+                # Overall Stream molar flow rates
+                setattr(model, f'S{i}', Var(within=NonNegativeReals, initialize=5))
 
-            # Individual component stream flow rates
-            setattr(model, f's{i}', Var(components, within=NonNegativeReals, initialize=5))
+                # Individual component stream flow rates
+                setattr(model, f's{i}', Var(components, within=NonNegativeReals, initialize=5))
 
-        # Individual component molar composition for all streams
-        model.x = Var(model.streams, components, within=NonNegativeReals, bounds=[0, 1])
+        # Individual component molar composition for all streams; in the reduced formulation
+        # an Expression of the flows, evaluated on demand and not part of the NLP
+        if self.reduced:
+            model.x = Expression(model.streams, components, rule=self._composition)
+        else:
+            model.x = Var(model.streams, components, within=NonNegativeReals, bounds=[0, 1])
    
         # Extents of Reaction
         model.zeta_1 = Var(within=NonNegativeReals, doc='Extent of reaction R1')
         model.zeta_2 = Var(within=NonNegativeReals, doc='Extent of reaction R2')
         model.zeta_3 = Var(within=NonNegativeReals, doc='Extent of reaction R3')
-        
-        
\ No newline at end of file
+
+    @staticmethod
+    def _composition(model, stream, component):
+        return getattr(model, f's{stream}')[component] / getattr(model, f'S{stream}')
+
+    def _define_indexed_stream_variables(self, model, components, total_initial, component_initial):
+        """
+        Define all stream flows as two indexed components instead of one
+        S{i} / s{i} pair per stream.
+        """
+        # Overall Stream molar flow rates
+        model.F = Var(model.streams, within=NonNegativeReals, initialize=total_initial)
+
+        # Individual component stream flow rates
+        model.f = Var(model.streams, components, within=NonNegativeReals, initialize=component_initial)
+
+        # Plain (non-component) aliases so the unit equations can keep writing
+        # model.S20 / model.s20['Benzene']
+        for i in model.streams:
+            setattr(model, f'S{i}', model.F[i])
+            setattr(model, f's{i}', {component: model.f[i, component] for component in components})
@@ -1,65 +1,233 @@
-from pyomo.environ import ConcreteModel, SolverFactory, Objective, maximize, Constraint, Var, Suffix, minimize
+from pyomo.environ import ConcreteModel, SolverFactory, TransformationFactory, Objective, maximize, Constraint, Var, Param, Set, Suffix, value, minimize
+from pyomo.core.expr.visitor import replace_expressions, identify_variables
+from pyomo.common.collections import ComponentMap, ComponentSet
+from pyomo.contrib.incidence_analysis import IncidenceGraphInterface
 from parameters import Parameters
 from variables import Variables
 from constraints import Constraints
+from stream_table import StreamTable
+from solve_cache import SolveCache, cached_solve
+from presolve import BlockTriangularPresolve
+from scaling import set_scaling_factors, propagate_solution
+from telemetry import SolveTelemetry, max_infeasibility
+from tearing import TearSolver, TearResult
+from tear_selection import FlowsheetGraph
+from sequential_modular import SequentialModular
+from sensitivity import kkt_sensitivity
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+import os
+import itertools
+import tempfile
+import time
+import numpy as np
 import pandas as pd
 from pyomo.opt import TerminationCondition
 
+# Model owned by each grid-search worker process, with its freshly built values
+_worker_model = None
+_worker_initial_values = None
+
+
+def _build_worker_model(model_options, state):
+    """
+    ChemicalModel in a worker process, in the caller's state (see
+    ChemicalModel._worker_state). Workers solve without the solve cache, so concurrent
+    processes do not write and evict entries of the same directory.
+    """
+    chemical_model = ChemicalModel(**{**model_options, 'use_cache': False})
+    for name, param_value in state['params'].items():
+        chemical_model.model.params[name].set_value(param_value)
+    chemical_model.tearing_streams = list(state['tearing_streams'])
+    chemical_model.tear_consumers = list(state['tear_consumers'])
+    chemical_model.tearing_values = {stream: dict(values) for stream, values in state['tearing_values'].items()}
+    return chemical_model
+
+
+def _init_grid_worker(model_options, state):
+    """Build one ChemicalModel per worker process."""
+    global _worker_model, _worker_initial_values
+    _worker_model = _build_worker_model(model_options, state)
+    _worker_initial_values = [(var, var.value) for var in _worker_model.model.component_data_objects(Var)]
+
+
+def _evaluate_tear_initial_values(grid_point, tearing_options):
+    """Run solve_with_tearing from one grid point (one initial value per tear stream) and return its final tear error."""
+    chemical_model = _worker_model
+
+    # Start every grid point from the same state, not from the previous point's solution
+    for var, value in _worker_initial_values:
+        var.set_value(value, skip_validation=True)
+
+    for stream, initial_value in zip(chemical_model.tearing_streams, grid_point):
+        for component in chemical_model.components:
+            chemical_model.component_flow(int(stream[1:]), component).set_value(initial_value)
+
+    try:
+        with chemical_model.telemetry.tagged(grid_point=list(grid_point)):
+            result = chemical_model.solve_with_tearing(**tearing_options)
+    except Exception as error:  # A failed solve only disqualifies this grid point
+        print(f"Tearing from {grid_point} failed: {error}")
+        return grid_point, float('inf')
+    return grid_point, result.errors[-1]
+
+
+# Nominal optimum loaded by each screening worker: primal values and multipliers
+_worker_nominal_point = None
+
+
+def _screening_solver():
+    """ipopt with the options of ChemicalModel.solve, warm-started from the nominal optimum."""
+    solver = SolverFactory('ipopt')
+    solver.options['constr_viol_tol'] = 1e-8
+    solver.options['acceptable_constr_viol_tol'] = 1e-8
+    solver.options['warm_start_init_point'] = 'yes'
+    solver.options['warm_start_bound_push'] = 1e-6
+    solver.options['warm_start_mult_bound_push'] = 1e-6
+    solver.options['mu_init'] = 1e-6
+    return solver
+
+
+def _init_screening_worker(model_options, state, nominal_point):
+    """Build one ChemicalModel per worker process and resolve the nominal point by name."""
+    global _worker_model, _worker_nominal_point
+    _worker_model = _build_worker_model(model_options, state)
+    model = _worker_model.model
+    if not hasattr(model, 'objective'):
+        _worker_model.set_objective()
+    model.dual = Suffix(direction=Suffix.IMPORT_EXPORT)
+    model.ipopt_zL_out = Suffix(direction=Suffix.IMPORT)
+    model.ipopt_zU_out = Suffix(direction=Suffix.IMPORT)
+    model.ipopt_zL_in = Suffix(direction=Suffix.EXPORT)
+    model.ipopt_zU_in = Suffix(direction=Suffix.EXPORT)
+    _worker_nominal_point = {
+        key: [(model.find_component(name), value) for name, value in values.items()]
+        for key, values in nominal_point.items()
+    }
+
+
+def _screen_constraint(name):
+    """Deactivate one constraint, re-solve from the nominal optimum and return the objective."""
+    model = _worker_model.model
+    point = _worker_nominal_point
+    for var, value in point['primal']:
+        var.set_value(value, skip_validation=True)
+    for suffix, key in ((model.dual, 'dual'), (model.ipopt_zL_in, 'zL'), (model.ipopt_zU_in, 'zU')):
+        suffix.clear()
+        suffix.update(point[key])
+
+    constraint = model.find_component(name)
+    constraint.deactivate()
+    try:
+        results = _screening_solver().solve(model, load_solutions=False)
+        termination = results.solver.termination_condition
+        if termination not in (TerminationCondition.optimal, TerminationCondition.locallyOptimal):
+            return name, None, str(termination)
+        model.solutions.load_from(results)
+        return name, model.objective.expr(), str(termination)
+    except Exception as error:  # A failed solve only leaves this constraint unclassified
+        return name, None, f'error: {error}'
+    finally:
+        constraint.activate()
+
+
 class ChemicalModel:
     
-    def __init__(self):
-        self.model = ConcreteModel()
+    def __init__(self, indexed=False, use_cache=True, reduced=False, model=None):
+        # The flowsheet is built on model (e.g. a scenario Block, see ScenarioModel) if given
+        self.model = model if model is not None else ConcreteModel()
+        self.indexed = indexed
+        self.reduced = reduced  # Composition-free formulation: x is an Expression of the flows
         self.components = ['Hydrogen', 'Methane', 'Benzene', 'Toluene', 'ParaXylene', 'Diphenyl']
         self.parameters = Parameters()
         
         
-        # Set params as an attribute of model
-        self.model.params = self.parameters.params
+        # Parameters are mutable Params, so they can be changed (and differentiated) without
+        # rebuilding the model; model.params maps each parameter name to its Param
+        self.model.p = Param(list(self.parameters.params), initialize=self.parameters.params, mutable=True)
+        self.model.params = {name: self.model.p[name] for name in self.parameters.params}
+        self._sensitivity = None  # Cached parameter_sensitivity of the current solution
         
-        self.variables = Variables(self.model, self.components, self.model.params)
-        self.constraints = Constraints(self.model, self.model.params)
+        self.variables = Variables(self.model, self.components, self.model.params, indexed=indexed, reduced=reduced)
+        self.constraints = Constraints(self.model, self.model.params, indexed=indexed, reduced=reduced)
+
+        # Streams of the stream table; feed streams are taken from the parameters
+        self.table_streams = list(range(8, 19))
+        self.feed_streams = [8, 9]
+        self._flow_vars = None  # Flow variables of the other table streams, gathered once
+
+        # Outcome of the last solve, recorded by run_record
+        self.results = None
+        self.solve_time = None
+        self.iterations = None  # ipopt iterations of the last solve
+
+        # Solutions of previous identical solves, shared by every run in this directory
+        self.solve_cache = SolveCache() if use_cache else None
+
+        # Structured record of every solve, appended to solve_telemetry.jsonl
+        self.telemetry = SolveTelemetry()
         
         # Set up the objective function
         self.set_objective()
         
-        # Initialize tearing variables for s13 and s17
-        self.tearing_streams = ['s13', 's17', 'S13', 'S17']
+        # Tearing streams (recycles s13 and s17) and the constraints that consume
+        # them, i.e. the reactor feed mixer balances and the conversion definition
+        self.tearing_streams = ['s13', 's17']
+        self.tear_consumers = ['conversion_def_rule'] + [f'{component}_comp_rule1' for component in self.components]
         self.tearing_values = {
             's13': {component: 0.00001 for component in self.components},
-            's17': {component: 0.00001 for component in self.components},
-            'S13': 1000,
-            'S17': 300
+            's17': {component: 0.00001 for component in self.components}
         }
-        
-    def find_optimal_initial_values(self, s13_range, s17_range):
-        min_error = float('inf')  # Initialize with a large value
-        optimal_initial_values = {'s13': None, 's17': None}
 
-        for s13_init in s13_range:
-            for s17_init in s17_range:
-                # Set initial values
-                for component in self.components:
-                    self.model.s13[component].set_value(s13_init)
-                    self.model.s17[component].set_value(s17_init)
-
-                # Solve with tearing method
-                self.solvew_with_tearing()
-
-                # Calculate the error for this iteration
-                error = sum(
-                    abs(self.tearing_values[stream][component] - self.fetch_value(getattr(self.model, stream)[component]))
-                    for stream in ['s13', 's17']
-                    for component in self.components
-                )
+        # Reactor specifications held at their current values by solve_sequential_modular
+        # (the toluene conversion is a decision variable of the NLP)
+        self.sequential_specs = ['X']
+        
+    def find_optimal_initial_values(self, *tear_ranges, max_workers=None, **tearing_options):
+        """
+        Grid search over initial values of the tear streams, one range per stream of
+        self.tearing_streams (all components of a stream start at the same value).
+
+        Every grid point runs solve_with_tearing in a worker process that owns its own
+        ChemicalModel, built with this model's parameter values and tear streams; results
+        are collected as they complete. Returns the best initial values (with their final
+        tear error) and the full error map as a Series indexed by the initial values
+        (unstack() it for a table of two tear streams).
+        """
+        if len(tear_ranges) != len(self.tearing_streams):
+            raise ValueError(f"Expected one range per tear stream {self.tearing_streams}, got {len(tear_ranges)}.")
+        optimal_initial_values = {**{stream: None for stream in self.tearing_streams}, 'error': float('inf')}
+        errors = {}
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_grid_worker,
+                                 initargs=({'indexed': self.indexed, 'reduced': self.reduced},
+                                           self._worker_state())) as executor:
+            futures = [executor.submit(_evaluate_tear_initial_values, grid_point, tearing_options)
+                       for grid_point in itertools.product(*tear_ranges)]
+
+            for future in as_completed(futures):
+                grid_point, error = future.result()
+                errors[grid_point] = error
+                point = ', '.join(f"{stream} = {initial_value}"
+                                  for stream, initial_value in zip(self.tearing_streams, grid_point))
+                print(f"{point}: error = {error:.6e} ({len(errors)}/{len(futures)})")
 
                 # Update optimal values if this error is smaller
-                if error < min_error:
-                    min_error = error
-                    optimal_initial_values['s13'] = s13_init
-                    optimal_initial_values['s17'] = s17_init
-
-        return optimal_initial_values
-        
+                if error < optimal_initial_values['error']:
+                    optimal_initial_values.update(zip(self.tearing_streams, grid_point), error=error)
+
+        error_map = pd.Series(errors, dtype=float).sort_index()
+        error_map.index.names = self.tearing_streams
+        return optimal_initial_values, error_map
+
+    def _worker_state(self):
+        """Parameter values and tear streams that worker processes copy (see _build_worker_model)."""
+        return {
+            'params': {name: value(param) for name, param in self.model.params.items()},
+            'tearing_streams': list(self.tearing_streams),
+            'tear_consumers': list(self.tear_consumers),
+            'tearing_values': {stream: dict(values) for stream, values in self.tearing_values.items()},
+        }
 
     def count_equations_and_unknowns(self):
         """
@@ -75,80 +243,262 @@ class ChemicalModel:
 
         return num_constraints, num_variables 
     
-    def solve_with_tearing(self):
-        # Initial solve
-        self.solve()
-
-        # Define the tearing streams and initialize their values
-        self.tearing_streams = ['s13', 's17']
-        self.tearing_values = {
-            's13': {component: 1000 for component in self.components},
-            's17': {component: 1000 for component in self.components}
-        }
-
-        # Define a tolerance for the difference between successive values
-        tolerance = 1e-4
-
-        # Maximum number of iterations
-        max_iterations = 500
-
-        # Current iteration counter
-        current_iteration = 0
-
-        # List to store the error for each iteration
-        errors = []
-
-        # Loop until the tearing streams converge or max iterations reached
-        while current_iteration < max_iterations:
-            # Store the old values of the tearing streams
-            old_values = {
-                stream: {component: self.tearing_values[stream][component] for component in self.components}
-                for stream in self.tearing_streams
-            }
+    def flowsheet_graph(self):
+        """Stream graph of the flowsheet (FlowsheetGraph), derived from the balance equations."""
+        component_flows, stream_variables = ComponentMap(), ComponentMap()
+        for stream in self.model.streams:
+            stream_variables[self.total_flow(stream)] = stream
+            for component in self.components:
+                component_flows[self.component_flow(stream, component)] = stream
+                stream_variables[self.component_flow(stream, component)] = stream
+                if not self.reduced:
+                    stream_variables[self.model.x[stream, component]] = stream
+        return FlowsheetGraph(self.model, component_flows, stream_variables)
+
+    def select_tearing_streams(self, weights=None):
+        """
+        Choose the tear streams from the flowsheet graph instead of by hand: the
+        minimum-weight set of streams breaking every recycle loop, with weights mapping
+        stream names (e.g. 's13') to their cost, default 1 each. Sets tearing_streams,
+        tear_consumers and tearing_values for solve_with_tearing and returns the streams.
+        """
+        graph = self.flowsheet_graph()
+        weights = {int(stream[1:]): weight for stream, weight in (weights or {}).items()}
+        tears = graph.select_tears(weights)
 
-            # Update the tearing_values dictionary with the current values from the model
-            for stream in self.tearing_streams:
-                for component in self.components:
-                    current_value = self.fetch_value(getattr(self.model, stream)[component])
-                    self.tearing_values[stream][component] = current_value
+        self.tearing_streams = [f's{stream}' for stream in tears]
+        self.tear_consumers = graph.consumers(tears)
+        self.tearing_values = {stream: {component: 0.00001 for component in self.components}
+                               for stream in self.tearing_streams}
+        return self.tearing_streams
 
-            # Calculate the error for the current iteration
-            error = sum(
-                abs(self.tearing_values[stream][component] - old_values[stream][component])
-                for stream in self.tearing_streams
-                for component in self.components
-            )
-            errors.append(error)
+    def solve_with_tearing(self, method='wegstein', tolerance=1e-4, max_iterations=50, **method_options):
+        """
+        Solve the flowsheet by tearing the recycle streams.
 
-            # Check for convergence
-            converged = all(e < tolerance for e in errors)
+        In the constraints listed in self.tear_consumers the tear streams are replaced
+        by guess parameters, so one solve maps a tear guess x to the recomputed tear
+        streams g(x). The fixed point x = g(x) is found with TearSolver using direct
+        substitution ('direct'), bounded Wegstein ('wegstein') or Broyden ('broyden')
+        updates, starting from the current values of the tear streams.
+        """
+        tear_solver = TearSolver(method, tolerance, max_iterations, **method_options)
+        tear_vars = [self.component_flow(int(stream[1:]), component)
+                     for stream in self.tearing_streams for component in self.components]
+
+        original_expressions = self._tear_model()
+        try:
+            guesses = [self.model.tear_guess[stream, component]
+                       for stream in self.tearing_streams for component in self.components]
+
+            def recompute_tears(x):
+                for guess, value in zip(guesses, x):
+                    guess.set_value(value)
+                self.solve()
+                return [var.value if var.value is not None else 0.0 for var in tear_vars]
+
+            x0 = [var.value if var.value is not None else 0.0 for var in tear_vars]
+            with self.telemetry.tagged(caller='solve_with_tearing', tears=self.tearing_streams):
+                result = tear_solver.converge(recompute_tears, x0)
+        finally:
+            self._untear_model(original_expressions)
+
+        # Store the converged tear values on the model and in self.tearing_values
+        for var, value in zip(tear_vars, result.values):
+            var.set_value(value)
+        for stream in self.tearing_streams:
+            for component in self.components:
+                self.tearing_values[stream][component] = self.component_flow(int(stream[1:]), component).value
+
+        for i, error in enumerate(result.errors, 1):
+            print(f"Iteration {i}: Error = {error:.6e}")
+        print(f"Tearing ({method}): {result.iterations} iterations in {result.wall_time:.2f} s")
+
+        if not result.converged:
+            print("Warning: Maximum number of iterations reached without convergence.")
 
-            if converged:
-                break
+        return result
 
-            # If not converged, update the model with the new tearing values and solve again
+    def solve_sequential_modular(self, method='wegstein', tolerance=1e-4, max_iterations=50, fallback=True,
+                                 residual_tolerance=1e-6, **method_options):
+        """
+        Solve the flowsheet sequential-modularly instead of as one NLP.
+
+        The recycle is torn at self.tearing_streams as in solve_with_tearing, and every
+        evaluation of the tear streams is one pass through the square blocks of the torn
+        flowsheet in calculation order (SequentialModular): linear blocks directly,
+        nonlinear ones one equation at a time or with scipy's root. Only the tear streams
+        are converged, with TearSolver. The variables in self.sequential_specs are held at
+        their current values, so this simulates the flowsheet at given specifications
+        rather than optimizing it.
+
+        If the specifications do not make the torn flowsheet a square system (as for the
+        default specifications, under which some balances are structurally surplus), it
+        cannot be simulated block by block: with fallback set, the equation-oriented
+        solve() runs instead from the point of initialize(), and the returned TearResult
+        has converged=False and no iterations; without fallback the ValueError of
+        SequentialModular is raised.
+
+        The returned TearResult has converged=False unless the tear streams converged and
+        every equation of the flowsheet is met within residual_tolerance. If it has not
+        converged and fallback is set, the equation-oriented solve() finishes from the
+        sequential-modular point.
+        """
+        tear_solver = TearSolver(method, tolerance, max_iterations, **method_options)
+        tear_vars = [self.component_flow(int(stream[1:]), component)
+                     for stream in self.tearing_streams for component in self.components]
+        x0 = [var.value if var.value is not None else 0.0 for var in tear_vars]
+
+        start = time.perf_counter()
+        flowsheet = None
+        original_expressions = self._tear_model()
+        try:
+            flowsheet = self._sequential_modular()
+        except ValueError as error:
+            if not fallback:
+                raise
+            print(f"Sequential-modular not possible: {error}")
+        finally:
+            if flowsheet is None:
+                self._untear_model(original_expressions)
+        if flowsheet is None:
+            print("Finishing with the equation-oriented solve from initialize().")
+            self.initialize()
+            with self.telemetry.tagged(caller='solve_sequential_modular'):
+                self.solve()
+            return TearResult([var.value for var in tear_vars], False, 0, time.perf_counter() - start, [])
+
+        try:
+            guesses = [self.model.tear_guess[stream, component]
+                       for stream in self.tearing_streams for component in self.components]
+
+            def recompute_tears(x):
+                for guess, value in zip(guesses, x):
+                    guess.set_value(value)
+                flowsheet.evaluate()
+                return [var.value for var in tear_vars]
+
+            result = tear_solver.converge(recompute_tears, x0)
+            recompute_tears(result.values)  # Every stream at the final tear values
+        finally:
+            self._untear_model(original_expressions)
+
+        # Close the recycle with the final tear values and check the untorn flowsheet
+        for var, value in zip(tear_vars, result.values):
+            var.set_value(value)
+        for stream in self.tearing_streams:
+            for component in self.components:
+                self.tearing_values[stream][component] = self.component_flow(int(stream[1:]), component).value
+        residual = max_infeasibility(self.model)
+        result.converged = result.converged and residual <= residual_tolerance
+
+        print(f"Sequential-modular ({method}): {result.iterations} iterations in {result.wall_time:.3f} s, "
+              f"{len(flowsheet.steps)} steps, residual {residual:.3e}")
+        if not result.converged:
+            print("Warning: tear streams or flowsheet equations not converged.")
+            if fallback:
+                print("Finishing with the equation-oriented solve.")
+                with self.telemetry.tagged(caller='solve_sequential_modular'):
+                    self.solve()
+
+        return result
+
+    def initialize(self, passes=3, tear_guess=0.0):
+        """
+        Move every stream flow, total and mole fraction from the constant initial values
+        of Variables towards a mass-balance-consistent starting point for the NLP.
+
+        Every component flow of the tear streams is guessed as tear_guess (by default, no
+        recycle), then the feeds are propagated through the blocks of the torn flowsheet
+        in calculation order (SequentialModular) for the given number of passes, each pass
+        starting from the tear streams recomputed by the previous one. Where the flowsheet
+        is not a square system, its overdetermined part is satisfied in the least-squares
+        sense and the variables left free are held at their initial values.
+
+        After every pass the values are projected onto the variable bounds and the
+        largest equation residual of the untorn flowsheet is evaluated. The best pass is
+        kept only if its residual is below that of the incoming point; otherwise the
+        incoming values are restored. Returns the residual of the point kept.
+        """
+        start = time.perf_counter()
+        variables = [var for var in self.model.component_data_objects(Var) if not var.fixed]
+        incoming_residual = max_infeasibility(self.model)
+        best_values, best_residual, best_pass = [var.value for var in variables], incoming_residual, 0
+
+        flowsheet = None
+        for current_pass in range(1, passes + 1):
+            original_expressions = self._tear_model()
+            try:
+                if flowsheet is None:
+                    flowsheet = self._sequential_modular(square=False)
+                    for stream in self.tearing_streams:
+                        for component in self.components:
+                            self.model.tear_guess[stream, component] = tear_guess
+                flowsheet.evaluate()
+            finally:
+                self._untear_model(original_expressions)
+            for var in variables:
+                if var.value is not None:
+                    var.set_value(min(max(var.value, -np.inf if var.lb is None else var.lb),
+                                      np.inf if var.ub is None else var.ub), skip_validation=True)
             for stream in self.tearing_streams:
                 for component in self.components:
-                    getattr(self.model, stream)[component].set_value(self.tearing_values[stream][component])
-
-            self.solve()
-
-            # Increment the current iteration counter
-            current_iteration += 1
+                    self.model.tear_guess[stream, component] = self.component_flow(int(stream[1:]), component).value
+            residual = max_infeasibility(self.model)
+            if residual < best_residual:
+                best_values, best_residual, best_pass = [var.value for var in variables], residual, current_pass
+
+        for var, var_value in zip(variables, best_values):
+            var.set_value(var_value, skip_validation=True)
+        print(f"Initialization: {passes} passes through {len(flowsheet.steps)} steps in "
+              f"{time.perf_counter() - start:.3f} s ({len(flowsheet.held)} variables held, "
+              f"{len(flowsheet.overdetermined)} equations in least squares)")
+        if best_pass:
+            print(f"Residual {incoming_residual:.3e} -> {best_residual:.3e} (pass {best_pass} kept)")
+        else:
+            print(f"No pass improved on the incoming residual {incoming_residual:.3e}; "
+                  f"the incoming values are kept.")
+        return best_residual
+
+    def _sequential_modular(self, square=True):
+        """SequentialModular evaluation of the flowsheet, torn by _tear_model."""
+        return SequentialModular(self.model, [self.model.find_component(name) for name in self.sequential_specs],
+                                 square=square)
+
+    def _tear_model(self):
+        """Replace the tear streams by guess parameters in the tear-consuming constraints."""
+        model = self.model
+        keys = [(stream, component) for stream in self.tearing_streams for component in self.components]
+        if hasattr(model, 'tear_guess') and set(model.tear_index) != set(keys):
+            # The tear streams changed (select_tearing_streams): rebuild the guesses
+            model.del_component(model.tear_guess)
+            model.del_component(model.tear_index)
+        if not hasattr(model, 'tear_guess'):
+            model.tear_index = Set(initialize=keys, dimen=2)
+            model.tear_guess = Param(model.tear_index, mutable=True, initialize=0.0)
+        substitution = {
+            id(self.component_flow(int(stream[1:]), component)): model.tear_guess[stream, component]
+            for stream in self.tearing_streams for component in self.components
+        }
 
-        # Print the error for each iteration (optional)
-        for i, error in enumerate(errors, 1):
-            print(f"Iteration {i}: Error = {error:.6f}")
+        original_expressions = {}
+        for name in self.tear_consumers:
+            constraint = model.find_component(name)
+            original_expressions[name] = constraint.expr
+            constraint.set_value(replace_expressions(constraint.expr, substitution))
+        return original_expressions
 
-        # Check if the solution converged within the maximum number of iterations
-        if current_iteration == max_iterations and not converged:
-            print("Warning: Maximum number of iterations reached without convergence.")
+    def _untear_model(self, original_expressions):
+        """Restore the constraints modified by _tear_model."""
+        for name, expression in original_expressions.items():
+            self.model.find_component(name).set_value(expression)
 
-    def identify_redundant_constraints_sensitivity(self):
+    def identify_redundant_constraints_sensitivity(self, verbose=False):
         """Identify potential redundant constraints using sensitivity analysis."""
         self.model.dual = Suffix(direction=Suffix.IMPORT)
-        solver = SolverFactory('ipopt')
-        result = solver.solve(self.model, tee=True)
+        with self.telemetry.tagged(caller='identify_redundant_constraints_sensitivity'):
+            self.solve(verbose=verbose)
+        result = self.results
 
         # Check if the solver was successful
         if result.solver.termination_condition != TerminationCondition.optimal:
@@ -186,18 +536,202 @@ class ChemicalModel:
         for rc in redundant_constraints:
             print(rc)
 
+    def screen_redundant_constraints(self, dual_tolerance=1e-6, objective_tolerance=1e-6, bound_tolerance=1e-6,
+                                     max_workers=None):
+        """
+        Rank the constraints by how redundant they are at the optimum.
+
+        Faster equivalent of identify_redundant_constraints_deactivation. After one
+        nominal solve (with multipliers), a constraint is classified without solving if
+        - it contains a variable that appears in no other active constraint nor in the
+          objective, and whose bounds (if any) are inactive at the optimum by more than
+          bound_tolerance: deactivating it only frees that variable ('structural',
+          redundant); at an active bound the constraint still acts as an inequality on
+          the other variables;
+        - its multiplier exceeds dual_tolerance: relaxing it improves the objective at
+          first order ('dual', not redundant).
+        The remaining candidates are deactivated one at a time in worker processes (with
+        this model's parameter values), each solve warm-started from the nominal
+        primal-dual point ('solve').
+
+        Returns a DataFrame with one row per constraint (dual, Dulmage-Mendelsohn block of
+        the equality system, objective change, redundant flag), redundant ones first.
+        """
+        if not hasattr(self.model, 'objective'):
+            raise ValueError("Screening compares objective values; call set_objective() first.")
+
+        model = self.model
+        for name in ('dual', 'ipopt_zL_out', 'ipopt_zU_out'):
+            if not hasattr(model, name):
+                setattr(model, name, Suffix(direction=Suffix.IMPORT))
+        solver = SolverFactory('ipopt')
+        solver.options['constr_viol_tol'] = 1e-8
+        solver.options['acceptable_constr_viol_tol'] = 1e-8
+        result = solver.solve(model)
+        if result.solver.termination_condition != TerminationCondition.optimal:
+            print("Solver did not converge. Cannot screen the constraints.")
+            return None
+        nominal_objective = model.objective.expr()
+        nominal_point = {
+            'primal': {var.name: var.value for var in model.component_data_objects(Var)},
+            'dual': {c.name: value for c, value in model.dual.items()},
+            'zL': {v.name: value for v, value in model.ipopt_zL_out.items()},
+            'zU': {v.name: value for v, value in model.ipopt_zU_out.items()},
+        }
+
+        # Structural analysis of the active equality system
+        _, constraint_blocks = IncidenceGraphInterface(model, include_inequality=False).dulmage_mendelsohn()
+        igraph = IncidenceGraphInterface(model)
+        structure = ComponentMap()
+        for block in ('unmatched', 'underconstrained', 'overconstrained', 'square'):
+            for c in getattr(constraint_blocks, block):
+                structure[c] = block
+        objective_vars = ComponentSet(identify_variables(model.objective.expr))
+
+        def free(v):
+            return ((v.lb is None or v.value - v.lb > bound_tolerance)
+                    and (v.ub is None or v.ub - v.value > bound_tolerance))
+
+        report = []
+        candidates = []
+        for c in model.component_data_objects(Constraint, active=True):
+            dual = model.dual.get(c, 0.0)
+            row = {'constraint': c.name, 'dual': dual, 'structure': structure.get(c, 'inequality'),
+                   'screening': None, 'objective_change': None, 'redundant': None}
+            private = [v for v in identify_variables(c.body, include_fixed=False)
+                       if v not in objective_vars and len(igraph.get_adjacent_to(v)) == 1 and free(v)]
+            if private:
+                row.update(screening='structural', objective_change=0.0, redundant=True)
+            elif abs(dual) > dual_tolerance:
+                row.update(screening='dual', redundant=False)
+            else:
+                row['screening'] = 'solve'
+                candidates.append(c.name)
+            report.append(row)
+
+        # Deactivation solves for the remaining candidates
+        rows = {row['constraint']: row for row in report}
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_screening_worker,
+                                 initargs=({'indexed': self.indexed, 'reduced': self.reduced},
+                                           self._worker_state(), nominal_point)) as executor:
+            futures = [executor.submit(_screen_constraint, name) for name in candidates]
+            for done, future in enumerate(as_completed(futures), 1):
+                name, objective, termination = future.result()
+                row = rows[name]
+                if objective is None:
+                    row.update(screening=f'failed ({termination})')
+                else:
+                    change = objective - nominal_objective
+                    row.update(objective_change=change, redundant=abs(change) < objective_tolerance)
+                print(f"Screened {name}: {termination} ({done}/{len(futures)})")
+
+        report = pd.DataFrame(report)
+        ranking = pd.DataFrame({
+            'redundant': report['redundant'].fillna(False).astype(bool),
+            'change': pd.to_numeric(report['objective_change']).abs().fillna(float('inf')),
+            'dual': report['dual'].abs(),
+        })
+        order = ranking.sort_values(['redundant', 'change', 'dual'], ascending=[False, True, True]).index
+        return report.loc[order].reset_index(drop=True)
+
             
     def set_objective(self):
         """Define the objective function for the model."""
         #self.model.objective = Objective(expr=self.model.s18['Diphenyl'], sense=minimize)
         self.model.objective = Objective(expr=self.model.s15['Benzene'], sense=maximize)
         
-    def solve(self):
+    def solve(self, use_cache=True, presolve=False, scale=False, verbose=False):
+        self._sensitivity = None
         solver = SolverFactory('ipopt')
         solver.options['constr_viol_tol'] = 1e-8
         solver.options['acceptable_constr_viol_tol'] = 1e-8
+        handle, logfile = tempfile.mkstemp(suffix='_ipopt.log')
+        os.close(handle)
+
+        start = time.perf_counter()
+        # With presolve, the structurally determined blocks are solved directly and only
+        # the remainder goes to the solver (see BlockTriangularPresolve)
+        with BlockTriangularPresolve(self.model) if presolve else nullcontext() as presolved:
+            if presolve:
+                print(presolved)
+            # With scale, a copy scaled from nominal values (core.scale_model) is solved and
+            # its solution mapped back
+            target = self.model
+            if scale:
+                set_scaling_factors(self.model)
+                scaling = TransformationFactory('core.scale_model')
+                target = scaling.create_using(self.model)
+            self.results, cache_hit = cached_solve(self.solve_cache if use_cache else None, target, solver,
+                                                   self.model.params, tee=verbose, logfile=logfile)
+            if scale:
+                propagate_solution(scaling, target, self.model)
+        self.solve_time = time.perf_counter() - start
+        record = self.telemetry.record(self.model, self.results, self.solve_time, logfile, flowsheet='HDA',
+                                       cache_hit=cache_hit, presolve=presolve, scale=scale)
+        self.iterations = record['iterations']
+        os.remove(logfile)
+        if cache_hit:
+            print(f"Solution loaded from the solve cache ({self.solve_time * 1000:.1f} ms)")
+
+    def scaling_report(self):
+        """
+        Solve from the current point without and with automatic scaling, bypassing the
+        solve cache, and compare ipopt iterations, solve time and termination. The model is
+        left at the scaled solution.
+        """
+        start_point = [(var, var.value) for var in self.model.component_data_objects(Var)]
+        report = {}
+        for label, scale in [('unscaled', False), ('scaled', True)]:
+            for var, var_value in start_point:
+                var.set_value(var_value, skip_validation=True)
+            with self.telemetry.tagged(caller='scaling_report'):
+                self.solve(use_cache=False, scale=scale)
+            report[label] = {'iterations': self.iterations, 'solve_time': self.solve_time,
+                             'termination': str(self.results.solver.termination_condition)}
+        return pd.DataFrame(report).T
+
+    def parameter_sensitivity(self):
+        """
+        First-order derivatives of every variable (stream flows included) and of the
+        objective with respect to every parameter in model.params, at the current solution.
 
-        solver.solve(self.model, tee=True)
+        Computed once from the KKT system of the converged model (see sensitivity.py) and
+        kept until the next solve. Returns a DataFrame indexed by variable name, plus an
+        'objective' row if the model has an objective, with one column per parameter.
+        """
+        if self._sensitivity is None:
+            dx_dp, dobj_dp = kkt_sensitivity(self.model, list(self.model.params.values()))
+            dx_dp.columns = list(self.model.params)
+            if dobj_dp is not None:
+                dx_dp.loc['objective'] = dobj_dp.values
+            self._sensitivity = dx_dp
+        return self._sensitivity
+
+    def predict_stream_table(self, changes):
+        """
+        Predict the stream table after small parameter changes, e.g. {'FR_S11_LK': 0.995},
+        by a first-order step from the current solution instead of a new solve.
+        """
+        sensitivity = self.parameter_sensitivity().drop(index='objective', errors='ignore')
+        delta = pd.Series({name: new_value - value(self.model.params[name]) for name, new_value in changes.items()})
+        shift = sensitivity[delta.index] @ delta
+
+        # Evaluate the table at the predicted point, then restore the solution
+        original_params = [(self.model.params[name], value(self.model.params[name])) for name in changes]
+        original_values = []
+        try:
+            for name, new_value in changes.items():
+                self.model.params[name].set_value(new_value)
+            for name, step in shift[shift != 0].items():
+                var = self.model.find_component(name)
+                original_values.append((var, var.value))
+                var.set_value(var.value + step, skip_validation=True)
+            return self.generate_stream_table()
+        finally:
+            for var, original in original_values:
+                var.set_value(original, skip_validation=True)
+            for param, original in original_params:
+                param.set_value(original)
 
     def fetch_value(self, var):
         """Fetch the value of a variable and round it."""
@@ -205,6 +739,19 @@ class ChemicalModel:
         if val is None or val < 0:
             return 0.0
         return round(val, 4)  
+
+    def total_flow(self, stream):
+        """Return the overall molar flow variable of a stream (e.g. 10 for S10)."""
+        if self.indexed:
+            return self.model.F[stream]
+        return getattr(self.model, f'S{stream}')
+
+    def component_flow(self, stream, component):
+        """Return the component molar flow variable of a stream (e.g. 10 for s10)."""
+        if self.indexed:
+            return self.model.f[stream, component]
+        return getattr(self.model, f's{stream}')[component]
+
 # Variable S8 version 
 #     def generate_stream_data(self, stream_name):
 #         """Generate molar flow rates for a given stream."""
@@ -223,19 +770,52 @@ class ChemicalModel:
 
 #         return molar_flow_rates
 
+    def stream_table(self):
+        """
+        Component flows of the table streams as a StreamTable, at full precision. Flow
+        values are read in one pass over the flow variables; feed streams are computed
+        from the parameters.
+        """
+        streams = self.table_streams
+        if self._flow_vars is None:
+            self._flow_vars = [self.component_flow(stream, component)
+                               for stream in streams if stream not in self.feed_streams
+                               for component in self.components]
+        flows = np.empty((len(streams), len(self.components)))
+        process_rows = [row for row, stream in enumerate(streams) if stream not in self.feed_streams]
+        flows[process_rows] = np.array([var.value for var in self._flow_vars], dtype=float).reshape(
+            len(process_rows), len(self.components))
+        for row, stream in enumerate(streams):
+            if stream in self.feed_streams:
+                flows[row] = [value(self.model.params[f'S{stream}']) * value(self.model.params[f'S{stream}_{component}'])
+                              for component in self.components]
+        return StreamTable([f's{stream}' for stream in streams], self.components, flows)
+
+    def run_record(self):
+        """Parameters, solver outcome and stream table of the last solve, for RunStore.add_run."""
+        results = self.results
+        objective = next(self.model.component_data_objects(Objective, active=True), None)
+        return {
+            'flowsheet': 'HDA',
+            'status': str(results.solver.status) if results is not None else None,
+            'termination': str(results.solver.termination_condition) if results is not None else None,
+            'solve_time': self.solve_time,
+            'objective': value(objective, exception=False) if objective is not None else None,
+            'parameters': {name: value(param) for name, param in self.model.params.items()},
+            'stream_table': self.stream_table(),
+        }
+
     def generate_stream_table(self):
-        """Generate a table with molar flow rates of each component in each stream."""
-        data = []  # This will store rows of data which will be used to create DataFrame
-
-        # For each stream
-        for i in range(8, 19):  # Adjusted the range to start from S8
-            stream_name = f's{i}'
-            data.append(self.generate_stream_data(stream_name))
-
-        # Creating DataFrame
-        stream_names = [f's{i}' for i in range(8, 19)]  # Adjusted the range to start from S8
-        df = pd.DataFrame(data, columns=self.components, index=stream_names)
-        return df
+        """
+        Generate a table with molar flow rates of each component in each stream. As in
+        fetch_value, flows without a value or negative are shown as 0 and the others are
+        rounded to 4 decimals; stream_table() keeps the full-precision values.
+        """
+        table = self.stream_table()
+        flows = table.flows.copy()
+        process_rows = [row for row, stream in enumerate(self.table_streams) if stream not in self.feed_streams]
+        flows[process_rows] = np.clip(np.nan_to_num(flows[process_rows], nan=0.0), 0.0, None).round(4)
+        return pd.DataFrame(flows, index=table.streams, columns=table.components)
     
     def generate_stream_data(self, stream_name):
         """Generate molar flow rates for a given stream."""
@@ -244,14 +824,14 @@ class ChemicalModel:
         if stream_name.lower() == 's8':
             # Assuming S8 is a parameter, fetch its value directly from the model.params
             s_flow = self.model.params['S8']
-            molar_flow_rates = [s_flow * self.model.params[f'S8_{component}'] for component in self.components]
+            molar_flow_rates = [value(s_flow * self.model.params[f'S8_{component}']) for component in self.components]
         elif stream_name.lower() == 's9':
             # Handle S9 similarly if it's also a special case
             s_flow = self.model.params['S9']
-            molar_flow_rates = [s_flow * self.model.params[f'S9_{component}'] for component in self.components]
+            molar_flow_rates = [value(s_flow * self.model.params[f'S9_{component}']) for component in self.components]
         else:
             # For other streams, use the existing method
-            molar_flow_rates = [self.fetch_value(getattr(self.model, f's{stream_index}')[component]) for component in self.components]
+            molar_flow_rates = [self.fetch_value(self.component_flow(stream_index, component)) for component in self.components]
 
         return molar_flow_rates
 
@@ -283,25 +863,25 @@ class ChemicalModel:
 
             # Stream S Results
             s_results = [
-                f"S{i}: {fetch_value(getattr(model, f'S{i}'))}" for i in range(10, 19)
+                f"S{i}: {fetch_value(self.total_flow(i))}" for i in range(10, 19)
             ]
             # Add results for S8 and S9 from parameters
-            s_results.insert(0, f"S8: {model.params['S8']}"); 
+            s_results.insert(0, f"S8: {value(model.params['S8'])}"); 
             s_results.insert(1, f"zeta_2: {model.zeta_2.value}");
-            s_results.insert(2, f"S9: {model.params['S9']}"); 
+            s_results.insert(2, f"S9: {value(model.params['S9'])}"); 
             s_results.insert(3, f"X: {model.X.value}")
             display_and_write(file, "\nStream S Results:", s_results)
 
             # Component molar flow rate results for Streams S10 to S18
             components = ['Hydrogen', 'Methane', 'Benzene', 'Toluene', 'ParaXylene', 'Diphenyl']
             molar_flowRate_results = [
-                f"Molar Flow rate of[{component}] in S{i}: {fetch_value(getattr(model, f's{i}')[component])}" 
+                f"Molar Flow rate of[{component}] in S{i}: {fetch_value(self.component_flow(i, component))}" 
                 for i in range(10, 19) for component in components
             ]
             # Add composition results for S8 and S9 from parameters
             for component in components:
-                molar_flowRate_results.insert(0, f"Molar Flow rate of[{component}] in S8: {model.params['S8'] * model.params[f'S8_{component}']}")
-                molar_flowRate_results.insert(1, f"Molar Flow rate of[{component}] in S9: {model.params['S9'] * model.params[f'S9_{component}']}")
+                molar_flowRate_results.insert(0, f"Molar Flow rate of[{component}] in S8: {value(model.params['S8'] * model.params[f'S8_{component}'])}")
+                molar_flowRate_results.insert(1, f"Molar Flow rate of[{component}] in S9: {value(model.params['S9'] * model.params[f'S9_{component}'])}")
             display_and_write(file, "\nComponent Flow Rate Results:", molar_flowRate_results)
 
             # Generate the stream table
@@ -5,16 +5,21 @@ from functools import partial
 class Constraints:
     components = ['Hydrogen', 'Methane', 'Benzene', 'Toluene', 'ParaXylene', 'Diphenyl']
 
-    def __init__(self, model, parameters=None):
+    def __init__(self, model, parameters=None, indexed=False, reduced=False):
         self.model = model
+        self.indexed = indexed
+        self.reduced = reduced
         if parameters:
             self.define_constraints(model, parameters)
 
     def define_constraints(self, model, parameters):
         self._initialize_streams(model)
-        self._add_composition_sum_constraint(model)
+        # The reduced formulation has no composition variables to define
+        if not self.reduced:
+            self._add_composition_sum_constraint(model)
         self._add_material_balance_constraints(model)
-        self._add_component_molar_composition_constraints(model)
+        if not self.reduced:
+            self._add_component_molar_composition_constraints(model)
         self._add_dynamic_constraints(model)
 
     def _initialize_streams(self, model):
@@ -26,10 +31,17 @@ class Constraints:
         model.composition_sum_constraint = Constraint(model.streams, rule=self.composition_sum_rule)
 
     def _add_material_balance_constraints(self, model):
+        if self.indexed:
+            model.Eq0 = Constraint(model.streams, rule=self.overall_material_balance)
+            return
         for i in model.streams:
             setattr(model, f'Eq0_S{i}', Constraint(expr=self.overall_material_balance(model, i)))
 
     def _add_component_molar_composition_constraints(self, model):
+        if self.indexed:
+            model.component_molar_composition = Constraint(model.streams, self.components,
+                                                           rule=self.component_molar_composition)
+            return
         for s in model.streams:
             for c in self.components:
                 constraint_name = f'component_molar_composition_S{s}_{c}'
@@ -201,6 +213,9 @@ class Constraints:
         return model.s16['Toluene'] == model.s17['Toluene'] + model.s18['Toluene']
     
     def Toluene_comp_rule5(self, model):
+        if self.reduced:
+            # Flow form: with nonnegative flows, zero mole fractions are zero component flows
+            return model.s11['Toluene'] + model.s13['Toluene'] + model.s14['Toluene'] == 0
         return model.x[11, 'Toluene'] + model.x[13, 'Toluene'] + model.x[14, 'Toluene'] == 0
     def Toluene_comp_rule6(self, model):
         return model.s15['Toluene'] == 0
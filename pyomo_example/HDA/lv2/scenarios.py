@@ -0,0 +1,142 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from pyomo.environ import ConcreteModel, Block, Set, Var, Constraint, Objective, SolverFactory, value
+from chemical_model import ChemicalModel
+from telemetry import SolveTelemetry
+
+# Flowsheet owned by each scenario worker process, with its freshly built values
+_worker_flowsheet = None
+_worker_initial_values = None
+_worker_initial_params = None
+
+
+def _init_scenario_worker(model_options):
+    """Build one ChemicalModel per worker process (without the solve cache, which the workers would share)."""
+    global _worker_flowsheet, _worker_initial_values, _worker_initial_params
+    _worker_flowsheet = ChemicalModel(**{**model_options, 'use_cache': False})
+    _worker_initial_values = [(var, var.value) for var in _worker_flowsheet.model.component_data_objects(Var)]
+    _worker_initial_params = [(param, value(param)) for param in _worker_flowsheet.model.params.values()]
+
+
+def _solve_scenario(name, overrides):
+    """Solve one scenario from the initial point. Returns its variable values by name and termination."""
+    flowsheet = _worker_flowsheet
+    # Start from the initial point and the nominal parameters, not from the previous scenario's
+    for var, var_value in _worker_initial_values:
+        var.set_value(var_value, skip_validation=True)
+    for param, param_value in _worker_initial_params:
+        param.set_value(param_value)
+    try:
+        for parameter, parameter_value in overrides.items():
+            flowsheet.model.params[parameter].set_value(parameter_value)
+        flowsheet.solve()
+    except Exception as error:  # A bad override or a failed solve only leaves this scenario unsolved
+        return name, {}, f'error: {error}'
+    values = {var.name: var.value for var in flowsheet.model.component_data_objects(Var)}
+    return name, values, str(flowsheet.results.solver.termination_condition)
+
+
+class ScenarioModel:
+    """
+    Parameter scenarios of the flowsheet stacked as the Blocks of one model.
+
+    Every scenario block is built by ChemicalModel (the same builders as a single run)
+    and then has its parameters overridden, e.g. recovery-spec variants:
+        ScenarioModel({'base': {}, 'tight': {'FR_S15_LK': 0.995, 'FR_S16_HK': 0.995}})
+    The scenario objectives are replaced by their weighted sum (equal weights by
+    default). Variables named in design are shared: each scenario's copy is linked to
+    one first-stage variable model.design[name], so one NLP finds the design that is
+    best over all scenarios.
+
+    Without design variables the scenarios are independent, and solve(parallel=True)
+    solves them block by block in a pool of worker processes instead.
+    """
+
+    def __init__(self, scenarios, design=(), weights=None, indexed=False, reduced=False):
+        self.scenarios = {name: dict(overrides) for name, overrides in scenarios.items()}
+        self.design = list(design)
+        self.weights = weights or {name: 1 / len(self.scenarios) for name in self.scenarios}
+        self.model_options = {'indexed': indexed, 'reduced': reduced}
+        self.flowsheets = {}  # Scenario name -> ChemicalModel built on its block
+        self.results = None
+        self.solve_time = None
+        self.telemetry = SolveTelemetry()
+
+        model = self.model = ConcreteModel()
+        model.scenarios = Set(initialize=list(self.scenarios), ordered=True)
+        model.scenario = Block(model.scenarios, rule=self._build_scenario)
+
+        objectives = [self.flowsheets[name].model.objective for name in self.scenarios]
+        for objective in objectives:
+            objective.deactivate()
+        model.objective = Objective(expr=sum(self.weights[name] * objective.expr
+                                             for name, objective in zip(self.scenarios, objectives)),
+                                    sense=objectives[0].sense)
+
+        if self.design:
+            model.design = Var(self.design, initialize={name: value(self.flowsheets[next(iter(self.scenarios))]
+                                                                    .model.find_component(name), exception=False)
+                                                        for name in self.design})
+            model.linking = Constraint(model.scenarios, self.design, rule=self._linking_rule)
+
+    def _build_scenario(self, block, name):
+        flowsheet = ChemicalModel(use_cache=False, model=block, **self.model_options)
+        for parameter, parameter_value in self.scenarios[name].items():
+            block.params[parameter].set_value(parameter_value)
+        self.flowsheets[name] = flowsheet
+
+    def _linking_rule(self, model, name, variable):
+        return model.scenario[name].find_component(variable) == model.design[variable]
+
+    def solve(self, parallel=False, max_workers=None, verbose=False):
+        """
+        Solve all scenarios: as one NLP with ipopt, or, with parallel and no design
+        variables, scenario by scenario in worker processes, loading each solution into
+        its block. Returns the termination condition of every scenario as a Series.
+        """
+        if parallel and self.design:
+            raise ValueError("Scenarios linked by design variables are solved as one NLP; use parallel=False.")
+        start = time.perf_counter()
+        if parallel:
+            terminations = self._solve_parallel(max_workers)
+            self.solve_time = time.perf_counter() - start
+        else:
+            solver = SolverFactory('ipopt')
+            solver.options['constr_viol_tol'] = 1e-8
+            solver.options['acceptable_constr_viol_tol'] = 1e-8
+            handle, logfile = tempfile.mkstemp(suffix='_ipopt.log')
+            os.close(handle)
+            self.results = solver.solve(self.model, tee=verbose, logfile=logfile)
+            self.solve_time = time.perf_counter() - start
+            self.telemetry.record(self.model, self.results, self.solve_time, logfile, flowsheet='HDA',
+                                  scenarios=len(self.scenarios), design=self.design)
+            os.remove(logfile)
+            termination = str(self.results.solver.termination_condition)
+            terminations = {name: termination for name in self.scenarios}
+        return pd.Series(terminations)[list(self.scenarios)]
+
+    def _solve_parallel(self, max_workers):
+        terminations = {}
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_scenario_worker,
+                                 initargs=(self.model_options,)) as executor:
+            futures = [executor.submit(_solve_scenario, name, overrides) for name, overrides in self.scenarios.items()]
+            for future in as_completed(futures):
+                name, values, termination = future.result()
+                block = self.model.scenario[name]
+                for var_name, var_value in values.items():
+                    block.find_component(var_name).set_value(var_value, skip_validation=True)
+                terminations[name] = termination
+                print(f"Scenario {name}: {termination} ({len(terminations)}/{len(futures)})")
+        return terminations
+
+    def objectives(self):
+        """Objective value of every scenario."""
+        return pd.Series({name: value(self.flowsheets[name].model.objective, exception=False)
+                          for name in self.scenarios})
+
+    def stream_tables(self):
+        """Stream table of every scenario, as a DataFrame indexed by (scenario, stream)."""
+        return pd.concat({name: self.flowsheets[name].stream_table().to_pandas() for name in self.scenarios})
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from pyomo.environ import Var, Param, Constraint, Objective, Suffix, value
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+
+
+class SolveCache:
+    """
+    On-disk cache of solver results, addressed by a hash of everything that determines
+    a solve: the model structure (active constraints and objective, variable bounds,
+    fixings and starting values), the values of all mutable parameters, and the solver
+    name and options. Expressions enter the key through a digest of their text that is
+    computed once per expression object (Pyomo expressions are immutable, so a changed
+    constraint has a new one), not at every solve. Digests are kept for the
+    max_expressions most recently used expressions.
+
+    Each entry is one JSON file with the solver status, termination condition, the
+    solution vector, the values of the model's import suffixes (duals and bound
+    multipliers) and the solver log. When the total size exceeds max_bytes, the least
+    recently used entries are evicted. The directory is created on the first store.
+    """
+
+    def __init__(self, directory='.solve_cache', max_bytes=64 * 2**20, max_expressions=4096):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_expressions = max_expressions
+        self._expression_digests = OrderedDict()  # id(expression) -> (expression, digest), least recent first
+
+    def _digest(self, expression):
+        # Pyomo expressions cannot be weakly referenced: the expression is kept with its
+        # digest, so its id cannot be reused by another object while the entry exists
+        known = self._expression_digests.get(id(expression))
+        if known is None:
+            known = (expression, hashlib.sha256(str(expression).encode()).hexdigest())
+            self._expression_digests[id(expression)] = known
+            if len(self._expression_digests) > self.max_expressions:
+                self._expression_digests.popitem(last=False)
+        else:
+            self._expression_digests.move_to_end(id(expression))
+        return known[1]
+
+    def key(self, model, solver_name, options, parameters=None):
+        digest = hashlib.sha256()
+        digest.update(f'{solver_name}\n'.encode())
+        for option, option_value in sorted((str(k), str(v)) for k, v in dict(options).items()):
+            digest.update(f'{option}={option_value}\n'.encode())
+        for name, parameter in sorted((parameters or {}).items()):
+            digest.update(f'{name}={value(parameter)!r}\n'.encode())
+        for suffix in _import_suffixes(model):  # A hit must restore every requested suffix
+            digest.update(f'suffix:{suffix.local_name}\n'.encode())
+        for param in model.component_data_objects(Param):
+            digest.update(f'{param.name}={value(param)!r}\n'.encode())
+        for var in model.component_data_objects(Var):
+            digest.update(f'{var.name}:{var.lb!r}:{var.ub!r}:{var.fixed}:{var.value!r}\n'.encode())
+        for constraint in model.component_data_objects(Constraint, active=True):
+            digest.update(f'{constraint.name}:{self._digest(constraint.expr)}\n'.encode())
+        for objective in model.component_data_objects(Objective, active=True):
+            digest.update(f'{objective.name}:{objective.sense}:{self._digest(objective.expr)}\n'.encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def load(self, model, key):
+        """
+        Load a cached solution, and the suffix values stored with it, into the model.
+        Returns the cached entry (status, termination, values, suffixes, log) or None on
+        a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+            os.utime(path)  # Mark as recently used
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        variables = {var.name: var for var in model.component_data_objects(Var)}
+        for name, var_value in entry['values'].items():
+            variables[name].set_value(var_value, skip_validation=True)
+        for suffix in _import_suffixes(model):
+            suffix.clear()
+            for name, suffix_value in entry.get('suffixes', {}).get(suffix.local_name, {}).items():
+                component = model.find_component(name)
+                if component is not None:
+                    suffix[component] = suffix_value
+        return entry
+
+    def store(self, model, key, status, termination, log=None):
+        """Save the current solution of the model under key, then enforce the size bound."""
+        entry = {
+            'status': status,
+            'termination': termination,
+            'values': {var.name: var.value for var in model.component_data_objects(Var)},
+            'suffixes': {suffix.local_name: {component.name: suffix_value for component, suffix_value in suffix.items()}
+                         for suffix in _import_suffixes(model)},
+            'log': log,
+        }
+        # Write to a temporary file and rename, so readers never see a partial entry
+        os.makedirs(self.directory, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'w') as file:
+            json.dump(entry, file)
+        os.replace(temporary, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
+
+
+def _import_suffixes(model):
+    return [suffix for suffix in model.component_objects(Suffix, descend_into=False) if suffix.import_enabled()]
+
+
+def _read_log(logfile):
+    try:
+        with open(logfile) as file:
+            return file.read()
+    except (FileNotFoundError, TypeError):
+        return None
+
+
+def cached_solve(cache, model, solver, parameters=None, **solve_options):
+    """
+    solver.solve(model) through the cache; cache=None solves directly. On a hit the
+    cached solution and suffix values (duals, bound multipliers) are loaded into the
+    model, the cached solver log is written to solve_options['logfile'] if given (so
+    iteration counts read from it are those of the original solve), and the returned
+    results only carry the cached status and termination condition. Returns (results,
+    cache_hit).
+    """
+    if cache is None:
+        return solver.solve(model, **solve_options), False
+
+    key = cache.key(model, solver.name, solver.options, parameters)
+    entry = cache.load(model, key)
+    if entry is not None:
+        if solve_options.get('logfile') and entry.get('log') is not None:
+            with open(solve_options['logfile'], 'w') as file:
+                file.write(entry['log'])
+        results = SolverResults()
+        results.solver.status = SolverStatus(entry['status'])
+        results.solver.termination_condition = TerminationCondition(entry['termination'])
+        return results, True
+
+    results = solver.solve(model, **solve_options)
+    if results.solver.status == SolverStatus.ok:
+        cache.store(model, key, str(results.solver.status), str(results.solver.termination_condition),
+                    _read_log(solve_options.get('logfile')))
+    return results, False
@@ -0,0 +1,136 @@
+import time
+import numpy as np
+
+
+class TearResult:
+    """Outcome of a tear-stream convergence run."""
+
+    def __init__(self, values, converged, iterations, wall_time, errors):
+        self.values = values          # Final tear vector
+        self.converged = converged    # True if the last iteration met the tolerance
+        self.iterations = iterations  # Number of evaluations of the flowsheet g(x)
+        self.wall_time = wall_time    # [s]
+        self.errors = errors          # Error of every iteration
+
+    def __repr__(self):
+        status = "converged" if self.converged else "not converged"
+        return (f"TearResult({status}, iterations={self.iterations}, "
+                f"wall_time={self.wall_time:.3f}s, error={self.errors[-1] if self.errors else float('nan'):.3e})")
+
+
+class DirectSubstitution:
+    """x_{k+1} = g(x_k)"""
+
+    def update(self, x, gx):
+        return gx
+
+
+class Wegstein:
+    """
+    Element-wise secant acceleration of direct substitution:
+    x_{k+1} = q x_k + (1 - q) g(x_k) with q = s / (s - 1) bounded to [q_min, q_max].
+    """
+
+    def __init__(self, q_min=-5.0, q_max=0.0):
+        self.q_min = q_min
+        self.q_max = q_max
+        self.previous = None
+
+    def update(self, x, gx):
+        if self.previous is None:
+            self.previous = (x, gx)
+            return gx
+
+        x_old, gx_old = self.previous
+        self.previous = (x, gx)
+
+        dx = x - x_old
+        q = np.zeros_like(x)
+        moved = np.abs(dx) > 1e-12
+        slope = (gx[moved] - gx_old[moved]) / dx[moved]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            q[moved] = np.where(slope != 1.0, slope / (slope - 1.0), self.q_min)
+        q = np.clip(q, self.q_min, self.q_max)
+        return q * x + (1.0 - q) * gx
+
+
+class Broyden:
+    """
+    Broyden's (good) quasi-Newton method on the residual f(x) = g(x) - x.
+    Starting from J = -I, so the first step is a direct substitution step.
+    """
+
+    def __init__(self, max_step=None):
+        self.max_step = max_step
+        self.H = None          # Inverse Jacobian estimate
+        self.previous = None
+
+    def update(self, x, gx):
+        f = gx - x
+        if self.H is None:
+            self.H = -np.eye(x.size)
+        else:
+            x_old, f_old = self.previous
+            dx = x - x_old
+            df = f - f_old
+            H_df = self.H @ df
+            denominator = dx @ H_df
+            if abs(denominator) > 1e-14:
+                self.H += np.outer(dx - H_df, dx @ self.H) / denominator
+        self.previous = (x, f)
+
+        step = -self.H @ f
+        if self.max_step is not None:
+            largest = np.max(np.abs(step))
+            if largest > self.max_step:
+                step *= self.max_step / largest
+        return x + step
+
+
+class TearSolver:
+    """
+    Converge the tear streams of a recycle flowsheet, x = g(x), where g solves the
+    torn flowsheet for given tear values and returns the recomputed tear values.
+    """
+
+    methods = {
+        'direct': DirectSubstitution,
+        'wegstein': Wegstein,
+        'broyden': Broyden,
+    }
+
+    def __init__(self, method='wegstein', tolerance=1e-4, max_iterations=50, lower_bound=0.0, **method_options):
+        if method not in self.methods:
+            raise ValueError(f"Unknown tear method '{method}'. Choose from {list(self.methods)}.")
+        self.method = method
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.lower_bound = lower_bound
+        self.method_options = method_options
+
+    def error(self, x, gx):
+        """Largest change of any tear variable, relative to its size (absolute below 1)."""
+        return float(np.max(np.abs(gx - x) / np.maximum(np.abs(x), 1.0)))
+
+    def converge(self, g, x0):
+        updater = self.methods[self.method](**self.method_options)
+        x = np.asarray(x0, dtype=float)
+        errors = []
+        converged = False
+        start = time.perf_counter()
+
+        for _ in range(self.max_iterations):
+            gx = np.asarray(g(x), dtype=float)
+            errors.append(self.error(x, gx))
+
+            # Converged when the current iteration meets the tolerance
+            if errors[-1] < self.tolerance:
+                x = gx
+                converged = True
+                break
+
+            x = updater.update(x, gx)
+            if self.lower_bound is not None:
+                x = np.maximum(x, self.lower_bound)
+
+        return TearResult(x, converged, len(errors), time.perf_counter() - start, errors)
@@ -0,0 +1,236 @@
+"""
+Benchmark suite of the example flowsheets.
+
+Every benchmark runs in a fresh interpreter (the flowsheets share module names such as
+chemical_model and parameters) inside a temporary working directory, and times its
+phases separately: model build, writing the solver input file (.nl for ipopt, .lp for
+glpk), solve and post-processing. After an untimed warm-up build, each phase is
+repeated and the median time is kept; the peak resident memory of the benchmark
+process is recorded as well. Results can be stored as a baseline, and later runs flag
+every phase slower (or every process larger) than the baseline by more than a relative
+threshold and by more than an absolute floor, so that the noise of millisecond phases
+is not reported.
+
+    python benchmarks.py                      # all benchmarks, compared with the baseline
+    python benchmarks.py HDA fraga_lv4 -r 9   # selected benchmarks, 9 repeats
+    python benchmarks.py --save-baseline      # store the results as the new baseline
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from pyomo.environ import SolverFactory
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PHASES = ['build', 'write', 'solve', 'postprocess']
+
+
+class FlowsheetBenchmark:
+    """A ChemicalModel flowsheet: built with options, solved with solve(), post-processed by a method."""
+
+    def __init__(self, directory, solver, options=None, postprocess='run_record'):
+        self.directory = directory
+        self.solver = solver
+        self.options = options if options is not None else {'use_cache': False}
+        self.postprocess_method = postprocess
+
+    def build(self):
+        return importlib.import_module('chemical_model').ChemicalModel(**self.options)
+
+    def model(self, built):
+        return built.model
+
+    def solve(self, built):
+        built.solve()
+
+    def postprocess(self, built):
+        return getattr(built, self.postprocess_method)()
+
+
+class FragaLv4Benchmark:
+    """The lv4 flowsheet, solved along a coarse residence-time continuation path."""
+    solver = 'ipopt'
+
+    def __init__(self, directory, path=range(5, 301, 25)):
+        self.directory = directory
+        self.path = path
+
+    def build(self):
+        main = importlib.import_module('main')
+        model = main.build_model()
+        main.initialize_flows(model)
+        return {'model': model, 'records': []}
+
+    def model(self, built):
+        return built['model']
+
+    def solve(self, built):
+        sweep = importlib.import_module('sweep')
+        parameters = importlib.import_module('parameters')
+        built['records'] = sweep.continuation_sweep(built['model'], self.path, parameters.set_residence_time)
+
+    def postprocess(self, built):
+        return pd.DataFrame(built['records'])
+
+
+class ReactorDesignBenchmark:
+    """The CSTR of reactor_design.py at one operating point."""
+    solver = 'ipopt'
+
+    def __init__(self, directory, data=None):
+        self.directory = directory
+        self.data = data if data is not None else {'caf': 10000, 'sv': 1.05}
+
+    def build(self):
+        return importlib.import_module('reactor_design').reactor_design_model(self.data)
+
+    def model(self, built):
+        return built
+
+    def solve(self, built):
+        SolverFactory(self.solver).solve(built)
+
+    def postprocess(self, built):
+        return pd.Series({name: built.component(name)() for name in ['ca', 'cb', 'cc', 'cd']})
+
+
+BENCHMARKS = {
+    'HDA': FlowsheetBenchmark('HDA/lv2', 'ipopt'),
+    'Cyclohexylbenzene': FlowsheetBenchmark('Cyclohexylbenzene/lv2', 'ipopt'),
+    'BT_Separation': FlowsheetBenchmark('BT_Separation/lv2', 'glpk'),
+    'fraga_lv2': FlowsheetBenchmark('fraga_lv2/py_version', 'glpk', options={}, postprocess='display_results'),
+    'fraga_lv4': FragaLv4Benchmark('fraga_lv4/py_version'),
+    'reactor_design': ReactorDesignBenchmark('.'),
+}
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def _run_benchmark(name, repeats):
+    """Run one benchmark in the current (fresh) process. Returns its result row."""
+    benchmark = BENCHMARKS[name]
+    sys.path.insert(0, os.path.join(ROOT, benchmark.directory))
+    solver_available = SolverFactory(benchmark.solver).available(exception_flag=False)
+    file_format = 'nl' if benchmark.solver == 'ipopt' else 'lp'
+    times = {phase: [] for phase in PHASES}
+    status = 'ok' if solver_available else f'{benchmark.solver} unavailable'
+
+    with tempfile.TemporaryDirectory() as work, open(os.devnull, 'w') as devnull:
+        os.chdir(work)  # Result files, caches and logs of the flowsheets stay out of the tree
+        with contextlib.redirect_stdout(devnull):
+            benchmark.build()  # Untimed, so module imports are not counted as build time
+            for _ in range(repeats):
+                start = time.perf_counter()
+                built = benchmark.build()
+                times['build'].append(time.perf_counter() - start)
+                times['write'].append(_timed(benchmark.model(built).write, f'model.{file_format}', file_format))
+                if solver_available:
+                    try:
+                        times['solve'].append(_timed(benchmark.solve, built))
+                    except Exception as error:  # A failed solve is reported, the other phases still run
+                        status = f'solve failed: {error}'
+                times['postprocess'].append(_timed(benchmark.postprocess, built))
+        os.chdir(ROOT)
+
+    row = {phase: statistics.median(values) if values else None for phase, values in times.items()}
+    row['peak_memory_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on Linux
+    row['status'] = status
+    return row
+
+
+def run_benchmarks(names=None, repeats=5):
+    """Run the benchmarks (all by default), each in its own process. Returns a DataFrame."""
+    rows = {}
+    for name in names or BENCHMARKS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            rows[name] = executor.submit(_run_benchmark, name, repeats).result()
+        print(f"{name}: " + ', '.join(f"{phase} {rows[name][phase]:.4f} s" for phase in PHASES
+                                      if rows[name][phase] is not None) + f" ({rows[name]['status']})")
+    return pd.DataFrame(rows).T[PHASES + ['peak_memory_mb', 'status']]
+
+
+def find_regressions(results, baseline, threshold=0.2, min_seconds=0.01, min_megabytes=1.0):
+    """
+    Phases slower than the baseline by more than threshold (relative) and min_seconds,
+    and peak memory above it by more than threshold and min_megabytes; both must be
+    exceeded. Times are medians over the repeats. Returns a list of (benchmark, metric,
+    baseline, current).
+    """
+    regressions = []
+    for name, row in results.iterrows():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric, floor in [(phase, min_seconds) for phase in PHASES] + [('peak_memory_mb', min_megabytes)]:
+            current, before = row[metric], reference.get(metric)
+            if current is None or before is None or pd.isna(current) or pd.isna(before):
+                continue
+            if current > before * (1 + threshold) and current - before > floor:
+                regressions.append((name, metric, before, current))
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(results, path):
+    """Store the results as the baseline, keeping the entries of benchmarks not run."""
+    baseline = load_baseline(path)
+    for name, row in results.iterrows():
+        baseline[name] = {metric: (None if pd.isna(row[metric]) else float(row[metric]))
+                          for metric in PHASES + ['peak_memory_mb']}
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the example flowsheets.')
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('-r', '--repeats', type=int, default=5, help='repetitions of every phase (median kept)')
+    parser.add_argument('-t', '--threshold', type=float, default=0.2,
+                        help='relative slowdown flagged as a regression')
+    parser.add_argument('--min-seconds', type=float, default=0.01,
+                        help='smallest absolute slowdown flagged as a regression')
+    parser.add_argument('--baseline', default=os.path.join(ROOT, 'benchmark_baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the baseline')
+    arguments = parser.parse_args()
+    unknown = [name for name in arguments.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks {unknown}")
+
+    results = run_benchmarks(arguments.names, arguments.repeats)
+    print(results.to_string())
+
+    if arguments.save_baseline:
+        save_baseline(results, arguments.baseline)
+        print(f"Baseline written to {arguments.baseline}")
+        return 0
+
+    regressions = find_regressions(results, load_baseline(arguments.baseline), arguments.threshold,
+                                   arguments.min_seconds)
+    for name, metric, before, current in regressions:
+        print(f"REGRESSION {name} {metric}: {before:.4g} -> {current:.4g} ({current / before - 1:+.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Opt-in profile of model construction.
+
+ConstructionProfiler wraps the builder steps of a model (functions and methods named
+define_*, _define_*, _add_* or _initialize_*, such as Constraints.define_constraints
+and its _add_* steps in the lv2 models or the define_* functions of the lv4 model) and,
+while active, every component added to a Pyomo block, i.e. every rule. For each step
+and each component it records the wall time, the number of components and component
+data objects created, their expression nodes and the memory they retain (tracemalloc,
+which also slows construction down; pass memory=False for plain timings).
+
+    profiler = ConstructionProfiler().watch(constraints.Constraints).watch(variables.Variables)
+    with profiler:
+        ChemicalModel()
+    print(profiler.step_report())
+    print(profiler.component_report())
+
+or, for the flowsheets of the benchmark suite:
+
+    python construction_profiler.py HDA
+"""
+import argparse
+import importlib
+import inspect
+import os
+import sys
+import time
+import tracemalloc
+import pandas as pd
+from pyomo.environ import Constraint, Objective, Expression
+from pyomo.core.base.block import _BlockData
+from pyomo.core.expr.visitor import sizeof_expression
+
+BUILDER_PREFIXES = ('define_', '_define_', '_add_', '_initialize_')
+
+
+def _rule_name(component):
+    """Name of the rule function a component was built with, if any."""
+    for attribute in ('rule', '_rule', '_rule_init'):
+        function = getattr(getattr(component, attribute, None), '_fcn', None)
+        if function is not None:
+            return getattr(function, '__name__', None)
+    return None
+
+
+class ConstructionProfiler:
+    """Time, size and memory of the builder steps and components constructed while active."""
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.steps = []       # One record per builder step call, in order of completion
+        self.components = []  # One record per component added to a block
+        self._targets = []    # (owner, name) of the watched builder steps
+        self._patches = []    # (owner, name, original attribute) while active
+        self._stack = []      # Names of the running steps
+        self._depth = 0       # Nesting of add_component calls (implicit index sets)
+        self._started_tracing = False
+
+    def watch(self, owner, names=None):
+        """
+        Profile the builder steps of owner, a class or a module: the functions named in
+        names, by default every function whose name has one of BUILDER_PREFIXES.
+        Functions imported into a module are watched in that module's namespace.
+        """
+        if names is None:
+            names = [name for name, attribute in vars(owner).items()
+                     if name.startswith(BUILDER_PREFIXES) and callable(getattr(attribute, '__func__', attribute))]
+        self._targets.extend((owner, name) for name in names)
+        return self
+
+    def __enter__(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        for owner, name in self._targets:
+            attribute = vars(owner)[name]
+            self._patches.append((owner, name, attribute))
+            setattr(owner, name, self._wrap_step(attribute, f'{owner.__name__}.{name}'))
+        self._patches.append((_BlockData, 'add_component', _BlockData.add_component))
+        _BlockData.add_component = self._wrap_add_component(_BlockData.add_component)
+        return self
+
+    def __exit__(self, *exc_info):
+        for owner, name, attribute in reversed(self._patches):
+            setattr(owner, name, attribute)
+        self._patches = []
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _memory(self):
+        return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+    def _wrap_step(self, attribute, name):
+        kind = type(attribute) if isinstance(attribute, (staticmethod, classmethod)) else None
+        function = attribute.__func__ if kind else attribute
+        profiler = self
+
+        def step(*args, **kwargs):
+            first_component = len(profiler.components)
+            start_memory, start = profiler._memory(), time.perf_counter()
+            profiler._stack.append(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler._stack.pop()
+                elapsed = time.perf_counter() - start
+                created = profiler.components[first_component:]
+                profiler.steps.append({
+                    'step': name,
+                    'depth': len(profiler._stack),
+                    'time_s': elapsed,
+                    'components': len(created),
+                    'data': sum(record['data'] for record in created),
+                    'nodes': sum(record['nodes'] for record in created),
+                    'memory_kb': (profiler._memory() - start_memory) / 1024,
+                })
+
+        step.__name__, step.__doc__, step.__wrapped__ = function.__name__, function.__doc__, function
+        return kind(step) if kind else step
+
+    def _wrap_add_component(self, add_component):
+        profiler = self
+
+        def profiled_add_component(block, name, component):
+            if profiler._depth:
+                return add_component(block, name, component)
+            profiler._depth += 1
+            start_memory, start = profiler._memory(), time.perf_counter()
+            try:
+                return add_component(block, name, component)
+            finally:
+                elapsed = time.perf_counter() - start
+                profiler._depth -= 1
+                data = list(component.values()) if component.is_indexed() else [component]
+                nodes = 0
+                if component.ctype in (Constraint, Objective, Expression):
+                    nodes = sum(sizeof_expression(item.expr) for item in data if item.expr is not None)
+                profiler.components.append({
+                    'step': profiler._stack[-1] if profiler._stack else None,
+                    'component': name,
+                    'ctype': component.ctype.__name__,
+                    'rule': _rule_name(component),
+                    'time_s': elapsed,
+                    'data': len(data),
+                    'nodes': nodes,
+                    'memory_kb': (profiler._memory() - start_memory) / 1024,
+                })
+
+        return profiled_add_component
+
+    def step_report(self):
+        """Builder steps in order of completion (nested steps before the step calling them)."""
+        return pd.DataFrame(self.steps, columns=['step', 'depth', 'time_s', 'components', 'data', 'nodes',
+                                                 'memory_kb'])
+
+    def component_report(self, by='component'):
+        """Components by construction time; by='rule' or 'step' totals them per rule function or step."""
+        columns = ['step', 'component', 'ctype', 'rule', 'time_s', 'data', 'nodes', 'memory_kb']
+        report = pd.DataFrame(self.components, columns=columns)
+        if by != 'component':
+            # Components built without a rule function (Constraint(expr=...)) count on their own
+            key = report['rule'].fillna(report['component']) if by == 'rule' else report[by].fillna('-')
+            report = report.groupby(key.rename(by)).agg(
+                components=('component', 'size'), time_s=('time_s', 'sum'), data=('data', 'sum'),
+                nodes=('nodes', 'sum'), memory_kb=('memory_kb', 'sum'))
+        return report.sort_values('time_s', ascending=False)
+
+
+def profile_benchmark(name, memory=True):
+    """Profile the build phase of one benchmark of benchmarks.py. Returns the profiler."""
+    from benchmarks import BENCHMARKS
+
+    benchmark = BENCHMARKS[name]
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), benchmark.directory)
+    sys.path.insert(0, directory)
+
+    profiler = ConstructionProfiler(memory)
+    for module_name in ['sets', 'parameters', 'variables', 'constraints', 'objective', 'main']:
+        if not os.path.exists(os.path.join(directory, f'{module_name}.py')):
+            continue
+        module = importlib.import_module(module_name)
+        profiler.watch(module)
+        for owner in vars(module).values():
+            if inspect.isclass(owner) and owner.__module__ == module_name:
+                profiler.watch(owner)
+
+    benchmark.build()  # Untimed, so module imports are not profiled
+    with profiler:
+        benchmark.build()
+    return profiler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile the construction of a flowsheet model.')
+    parser.add_argument('name', help='benchmark name, as in benchmarks.py (e.g. HDA, fraga_lv4)')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc for undistorted timings')
+    parser.add_argument('--top', type=int, default=20, help='number of components listed')
+    arguments = parser.parse_args()
+
+    profiler = profile_benchmark(arguments.name, memory=not arguments.no_memory)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(profiler.step_report().to_string(index=False))
+        print()
+        print(profiler.component_report(by='rule').head(arguments.top).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,12 @@
-from pyomo.environ import ConcreteModel, SolverFactory
+import os
+import tempfile
+import time
+import pandas as pd
+from pyomo.environ import ConcreteModel, SolverFactory, Objective, value
 from parameters import Parameters
 from variables import Variables
 from constraints import Constraints
+from telemetry import SolveTelemetry
 
 class ChemicalModel:
     def __init__(self):
@@ -15,9 +20,45 @@ class ChemicalModel:
         self.variables = Variables(self.model, self.components, self.model.params)
         self.constraints = Constraints(self.model, self.model.params)
 
-    def solve(self):
+        # Outcome of the last solve, recorded by run_record
+        self.results = None
+        self.solve_time = None
+        self.iterations = None  # Simplex iterations of the last solve
+
+        # Structured record of every solve, appended to solve_telemetry.jsonl
+        self.telemetry = SolveTelemetry()
+
+    def solve(self, verbose=False):
         solver = SolverFactory('glpk')
-        solver.solve(self.model, tee=True)
+        handle, logfile = tempfile.mkstemp(suffix='_glpk.log')
+        os.close(handle)
+
+        start = time.perf_counter()
+        self.results = solver.solve(self.model, tee=verbose, logfile=logfile)
+        self.solve_time = time.perf_counter() - start
+        record = self.telemetry.record(self.model, self.results, self.solve_time, logfile, flowsheet='fraga_lv2')
+        self.iterations = record['iterations']
+        os.remove(logfile)
+
+    def run_record(self):
+        """
+        Parameters, solver outcome and stream flows of the last solve, for RunStore.add_run.
+        The level-2 balance only has total flows, stored as the 'Total' component.
+        """
+        results = self.results
+        model = self.model
+        objective = next(model.component_data_objects(Objective, active=True), None)
+        flows = {'Feed1': model.F1, 'Feed2': model.F2, 'Purge': model.PG, 'Byprod': model.BPD}
+        return {
+            'flowsheet': 'fraga_lv2',
+            'status': str(results.solver.status) if results is not None else None,
+            'termination': str(results.solver.termination_condition) if results is not None else None,
+            'solve_time': self.solve_time,
+            'objective': value(objective, exception=False) if objective is not None else None,
+            'parameters': dict(model.params),
+            'stream_table': pd.DataFrame({'Total': [value(var, exception=False) for var in flows.values()]},
+                                         index=list(flows)),
+        }
 
     def display_results(self):
         # Specify the filename where you want to store the results
@@ -1,4 +1,5 @@
 from chemical_model import ChemicalModel
+from run_store import RunStore
 
 if __name__ == "__main__":
     chemical_model = ChemicalModel()
@@ -6,3 +7,6 @@ if __name__ == "__main__":
     chemical_model.solve()
     chemical_model.display_results()
 
+    # Keep every run in the run history database
+    with RunStore('run_history.db') as run_store:
+        run_store.add_run(chemical_model.run_record())
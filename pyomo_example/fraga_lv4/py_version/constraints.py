@@ -1,4 +1,4 @@
-from pyomo.environ import Constraint
+from pyomo.environ import Constraint, Var, log
 
 def define_constraints(model):
     # 1. Feed2 Stoichiometric Ratio Constraint
@@ -45,13 +45,14 @@ def define_constraints(model):
     def distillation_presence_rules(model, col, comp):
         if col == 1:
             if comp in {'Bz', 'EB'}:
-                return model.aD1[comp] == model.r1 if comp == 'Bz' else 1 - model.r1
+                return model.aD1[comp] == (model.r1 if comp == 'Bz' else 1 - model.r1)
         if col == 2:
             if comp in {'P', 'Bz'}:
-                return model.aD2[comp] == model.r2 if comp == 'P' else 1 - model.r2
+                return model.aD2[comp] == (model.r2 if comp == 'P' else 1 - model.r2)
         if col == 3:
             if comp in {'EB', 'DEB'}:
-                return model.aD3[comp] == model.r3 if comp == 'EB' else 1 - model.r3
+                return model.aD3[comp] == (model.r3 if comp == 'EB' else 1 - model.r3)
+        return Constraint.Skip
     model.distillation_presence = Constraint([(col, comp) for col in range(1, 4) for comp in model.comp], rule=distillation_presence_rules)
 
     # 7. Material Balance for Distillation Columns
@@ -68,21 +69,22 @@ def define_constraints(model):
             return model.aD3[comp] * model.f['Dist1bot', comp] == model.f[stm, comp]
         if stm == 'Byprod':
             return (1 - model.aD3[comp]) * model.f['Dist1bot', comp] == model.f[stm, comp]
+        return Constraint.Skip
     model.material_balance = Constraint([(stm, comp) for stm in model.stm for comp in model.comp], rule=material_balance_rules)
 
-    # 8. Error Calculation and Dummy Constraints
-    def error_calculation_rule(model):
-        return model.Err == sum((model.tearLiqRecycle[comp] - model.f['LiqRecycle', comp]) for comp in model.comp)
-    model.error_calculation = Constraint(rule=error_calculation_rule)
+    # 8. Product Purity Constraint
+    def purity_rule(model):
+        return model.f['Prod', 'EB'] >= model.purityEB * sum(model.f['Prod', comp] for comp in model.comp)
+    model.purity_constraint = Constraint(rule=purity_rule)
 
-    def dummy_eq_rule(model):
-        return model.error == model.Err
-    model.dummy_eq = Constraint(rule=dummy_eq_rule)
+    # 9. Selectivity and Conversion Correlations (residence time as a decision variable)
+    if model.t.ctype is Var:
+        def selectivity_correlation_rule(model):
+            return model.S == 371.60496 / model.t + 0.06379
+        model.selectivity_correlation = Constraint(rule=selectivity_correlation_rule)
 
-    # 9. Cost-Related Constraints
-    def cost_price_rule(model):
-        return model.feed_cost * 1e6 / model.convfact / model.OSPY == sum(model.f['Feed1', comp] * model.Price['E'] for comp in model.comp) + sum(model.f['Feed2', comp] * model.Price['Bz'] for comp in model.comp)
-    model.cost_price = Constraint(rule=cost_price_rule)
-    
-    def sales_price_rule(model):
-        return model.output_sales * 1e6 / model.convfact / model.OSPY == sum(model.f['Byprod', comp] * model.Price['DEB'] for comp in model.comp) + sum(model.f['Prod', comp] * model.Price)
+        def conversion_correlation_rule(model):
+            return model.x == -0.66214 + 0.23303 * log(model.t)
+        model.conversion_correlation = Constraint(rule=conversion_correlation_rule)
+
+    return model
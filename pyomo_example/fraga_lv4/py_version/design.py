@@ -0,0 +1,116 @@
+from math import sqrt
+import numpy as np
+from pyomo.environ import SolverFactory, value
+from main import build_model, initialize_flows
+from parameters import set_residence_time
+from sweep import define_warm_start_suffixes, save_point, restore_point, converged
+
+GOLDEN = (sqrt(5) - 1) / 2
+
+
+def _optimum(model, method, solves, status):
+    return {'t': value(model.t), 'r1': model.r1(), 'r2': model.r2(), 'r3': model.r3(),
+            'x': value(model.x), 'S': value(model.S), 'EP': value(model.EP),
+            'method': method, 'solves': solves, 'status': status}
+
+
+def optimize_nlp(solver=None, t_start=200, tee=False):
+    """
+    Optimize the residence time together with the flows and recoveries in one NLP: the
+    model is built in design mode (t a variable bounded to [5, 300], S and x given by
+    their correlations as constraints). It is first solved at the fixed starting t, and
+    from that solution with t free. Returns the model and the optimum.
+    """
+    if solver is None:
+        solver = SolverFactory('ipopt')
+    model = build_model(design=True)
+    set_residence_time(model, t_start)
+    initialize_flows(model)
+
+    model.t.fix()
+    results = solver.solve(model, tee=tee, load_solutions=False)
+    if converged(results):
+        model.solutions.load_from(results)
+    model.t.unfix()
+    results = solver.solve(model, tee=tee, load_solutions=False)
+    if not converged(results):
+        return model, {'method': 'nlp', 'solves': 2, 'status': str(results.solver.termination_condition)}
+    model.solutions.load_from(results)
+    return model, _optimum(model, 'nlp', 2, 'ok')
+
+
+def optimize_golden(solver=None, bounds=(5, 300), bracket_points=7, tol=0.5, tee=False):
+    """
+    Optimize the residence time by a 1-D search over the fixed-t NLP of main.py: EP is
+    evaluated at bracket_points evenly spaced values of t, and the interval around the
+    best of them is narrowed by golden-section search to a width of tol. Every inner
+    solve is warm-started from the converged solution at the nearest t already
+    evaluated; failed solves count as EP = -inf. Returns the model, holding the best
+    solution found, and the optimum.
+    """
+    if solver is None:
+        solver = SolverFactory('ipopt')
+    model = build_model()
+    initialize_flows(model)
+    define_warm_start_suffixes(model)
+    points = {}  # t -> (EP, snapshot of the solution) of every converged solve
+    solves = 0
+
+    def economic_potential(t):
+        nonlocal solves
+        if t in points:
+            return points[t][0]
+        if points:
+            restore_point(model, points[min(points, key=lambda known: abs(known - t))][1])
+            solver.options['warm_start_init_point'] = 'yes'
+        set_residence_time(model, t)
+        results = solver.solve(model, tee=tee, load_solutions=False)
+        solves += 1
+        if not converged(results):
+            return -np.inf
+        model.solutions.load_from(results)
+        points[t] = (value(model.EP), save_point(model))
+        return points[t][0]
+
+    grid = np.linspace(*bounds, bracket_points)
+    potentials = [economic_potential(float(t)) for t in grid]
+    best = int(np.argmax(potentials))
+    a, b = float(grid[max(best - 1, 0)]), float(grid[min(best + 1, len(grid) - 1)])
+
+    c, d = b - GOLDEN * (b - a), a + GOLDEN * (b - a)
+    ep_c, ep_d = economic_potential(c), economic_potential(d)
+    while b - a > tol:
+        if ep_c >= ep_d:
+            b, d, ep_d = d, c, ep_c
+            c = b - GOLDEN * (b - a)
+            ep_c = economic_potential(c)
+        else:
+            a, c, ep_c = c, d, ep_d
+            d = a + GOLDEN * (b - a)
+            ep_d = economic_potential(d)
+
+    if not points:
+        return model, {'method': 'golden', 'solves': solves, 'status': 'failed'}
+    t = max(points, key=lambda known: points[known][0])
+    restore_point(model, points[t][1])
+    set_residence_time(model, t)
+    return model, _optimum(model, 'golden', solves, 'ok')
+
+
+def optimize_residence_time(method='auto', solver=None, tee=False, **options):
+    """
+    Economic optimum over the residence time: t, r1..r3, x, S and EP, with the method
+    used, the number of NLP solves and the status. method is 'nlp' (optimize_nlp),
+    'golden' (optimize_golden) or 'auto', the NLP with the golden-section search as
+    fallback when it does not converge. options are passed on to the method (with
+    'auto', to optimize_nlp). Returns the model and the optimum.
+    """
+    if method not in ('auto', 'nlp', 'golden'):
+        raise ValueError(f"Unknown method '{method}'. Choose from 'auto', 'nlp' or 'golden'.")
+    if method in ('auto', 'nlp'):
+        model, optimum = optimize_nlp(solver, tee=tee, **options)
+        if optimum['status'] == 'ok' or method == 'nlp':
+            return model, optimum
+        print(f"Design NLP did not converge ({optimum['status']}); falling back to golden-section search")
+        options = {}
+    return optimize_golden(solver, tee=tee, **options)
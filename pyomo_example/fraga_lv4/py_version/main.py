@@ -1,32 +1,28 @@
 from pyomo.environ import *
 from sets import define_sets
-from parameters import define_parameters
+from parameters import define_parameters, set_residence_time
 from variables import define_variables
 from constraints import define_constraints
 from objective import define_objective
-import math
+from sweep import continuation_sweep
+from run_store import RunStore
+import pandas as pd
 
-def main():
+
+def build_model(design=False):
+    """The lv4 model; with design, the residence time t is a decision variable (see define_parameters)."""
     model = ConcreteModel()  # Initializing model as a ConcreteModel instance
-    
+
     if model is None:  # Ensuring that the model is not None after initialization
         raise Exception("Model is None after initialization.")
-        
+
     model = define_sets(model)  # Defining sets
-    
+
     if model is None:  # Ensuring that the model is not None after defining sets
         raise Exception("Model is None after defining sets.")
-        
-    print("Model after defining sets: ", model)
-    print("model.stm: ", model.stm)
-    print("model.comp: ", model.comp)
 
-    # # Check the existence of required sets before proceeding to define parameters
-    # if not hasattr(model, 'comp'):
-    #     raise Exception("model.comp is not defined. Please check define_sets function.")
-    
     # Define Parameters
-    model = define_parameters(model)
+    model = define_parameters(model, design)
 
     # Define Variables
     model = define_variables(model)
@@ -37,33 +33,72 @@ def main():
     # Define Objectives
     model = define_objective(model)
 
-    # Open a file to write results
-    with open('cengL4EP.data', 'w') as results:
-        results.write('#      t      r1       r2      r3      x       S       z      status \n')
+    return model
+
+
+def initialize_flows(model):
+    """Initialize all (free) stream flows to help get started in the search for the solution."""
+    for stm in model.stm:
+        for comp in model.comp:
+            if not model.f[stm, comp].fixed:
+                model.f[stm, comp] = 10
+    for comp in model.comp:
+        if not model.f['LiqRecycle', comp].fixed:
+            model.f['LiqRecycle', comp] = 80 * (1 - (model.r2.value or 0))
 
-        # Iterate over different values of t, the reactor residence time
-        for t in range(5, 301):  # equivalent to 'for(t = 5 to 300 by 1,' in GAMS
 
-            # Recalculate the selectivity and conversion for each different value of t
-            model.S = 371.60496 / t + 0.06379
-            model.x = -0.66214 + 0.23303 * math.log(t)
+def stream_table(model):
+    """Component flows of every stream as a DataFrame (streams x components)."""
+    return pd.DataFrame([[value(model.f[stm, comp], exception=False) for comp in model.comp] for stm in model.stm],
+                        index=list(model.stm), columns=list(model.comp))
+
+
+def run_record(record):
+    """RunStore record of one point of the residence time sweep."""
+    return {
+        'flowsheet': 'fraga_lv4',
+        'status': record['status'],
+        'termination': record['termination'],
+        'solve_time': None,
+        'objective': record['objective'],
+        'parameters': {'t': record['value']},
+        'stream_table': record.get('stream_table'),
+    }
+
+
+def main():
+    model = build_model()
+    print("model.stm: ", model.stm)
+    print("model.comp: ", model.comp)
+
+    # Only the first residence time starts from the generic initial point; every
+    # following one is warm-started from the previous solution
+    initialize_flows(model)
 
-            # Initialize all stream flows to help get started in the search for the solution
-            for stm in model.stm:
-                for comp in model.comp:
-                    model.f[stm, comp] = 10
-            for comp in model.comp:
-                model.f['LiqRecycle', comp] = 80 * (1 - model.r2)
+    # Iterate over different values of t, the reactor residence time
+    # (equivalent to 'for(t = 5 to 300 by 1,' in GAMS)
+    records = continuation_sweep(
+        model, range(5, 301), set_residence_time,
+        record=lambda model: {'r1': model.r1(), 'r2': model.r2(), 'r3': model.r3(),
+                              'x': value(model.x), 'S': value(model.S), 'EP': value(model.EP),
+                              'stream_table': stream_table(model)},
+    )
 
-            # Invoke the solver
-            solver = SolverFactory('ipopt')  # Assuming ipopt is the solver you are using
-            results = solver.solve(model, tee=True)
+    # Write the feasible points with a positive economic potential
+    with open('cengL4EP.data', 'w') as data_file:
+        data_file.write('#      t      r1       r2      r3      x       S       z      status \n')
+        for record in records:
+            if record['status'] == 'ok' and record['EP'] >= 0:
+                data_file.write(f"{record['value']} {record['r1']} {record['r2']} {record['r3']} "
+                                f"{record['x']} {record['S']} {record['EP']} ok\n")
 
-            # Check if the solution is optimal and the economic potential is positive
-            if str(results.Solver.Status) == 'ok':
-                if model.EP() >= 0:
-                    results.write(f"{t} {model.r1()} {model.r2()} {model.r3()} {model.x} {model.S} {model.EP()} ok\n")
+    # Keep every point in the run history database
+    with RunStore('run_history.db') as run_store:
+        run_store.add_runs(run_record(record) for record in records)
 
+    failed = [record['value'] for record in records if record['status'] != 'ok']
+    if failed:
+        print(f"No converged solution for t = {failed}")
     print('Optimization Complete.')
 
 if __name__ == '__main__':
@@ -3,26 +3,28 @@ from pyomo.environ import *
 # Assume model is the ConcreteModel object
 def define_objective(model):
 
-    # Define feed cost and output sales equations
-    model.feed_cost = Expression(expr=sum(model.f['Feed1', comp] * model.Price[comp] for comp in model.comp) +
-                                  sum(model.f['Feed2', comp] * model.Price[comp] for comp in model.comp))
+    # Define feed cost and output sales [Million Euros per year]
+    model.feed_cost = Expression(expr=(sum(model.f['Feed1', comp] for comp in model.comp) * model.Price['E'] +
+                                       sum(model.f['Feed2', comp] for comp in model.comp) * model.Price['Bz'])
+                                      * model.convfact * model.OSPY / 1e6)
 
-    model.output_sales = Expression(expr=sum(model.f['Byprod', comp] * model.Price[comp] for comp in model.comp) +
-                                     sum(model.f['Prod', comp] * model.Price[comp] for comp in model.comp))
+    model.output_sales = Expression(expr=(sum(model.f['Byprod', comp] for comp in model.comp) * model.Price['DEB'] +
+                                          sum(model.f['Prod', comp] for comp in model.comp) * model.Price['EB'])
+                                         * model.convfact * model.OSPY / 1e6)
 
     # Define unit costs for Distillation Columns, Reactor, and Heat Exchanger
-    model.dist1_c = Expression(expr=sqrt(sum(model.f['Reacteff', comp] for comp in model.comp)) * model.convfact * 100 *
-                                (1 - model.r1) * (model.alpha1 - 1))
+    model.dist1_c = Expression(expr=sqrt(sum(model.f['Reacteff', comp] for comp in model.comp) * model.convfact) /
+                                (100 * (1 - model.r1) * (model.alpha1 - 1)))
 
-    model.dist2_c = Expression(expr=sqrt(sum(model.f['Dist1top', comp] for comp in model.comp)) * model.convfact * 100 *
-                                (1 - model.r2) * (model.alpha2 - 1))
+    model.dist2_c = Expression(expr=sqrt(sum(model.f['Dist1top', comp] for comp in model.comp) * model.convfact) /
+                                (100 * (1 - model.r2) * (model.alpha2 - 1)))
 
-    model.dist3_c = Expression(expr=sqrt(sum(model.f['Dist1bot', comp] for comp in model.comp)) * model.convfact * 100 *
-                                (1 - model.r3) * (model.alpha3 - 1))
+    model.dist3_c = Expression(expr=sqrt(sum(model.f['Dist1bot', comp] for comp in model.comp) * model.convfact) /
+                                (100 * (1 - model.r3) * (model.alpha3 - 1)))
 
-    model.react_c = Expression(expr=model.t * sum(model.f['Mixeff', comp] for comp in model.comp) * model.convfact * 1000)
+    model.react_c = Expression(expr=model.t * sum(model.f['Mixeff', comp] for comp in model.comp) * model.convfact / 1000)
 
-    model.hex_c = Expression(expr=9 * (model.A**0.65) * 100)
+    model.hex_c = Expression(expr=9 * (model.A**0.65) / 100)
 
     # Define Net Value and Unit Costs
     model.netvalue = Expression(expr=model.output_sales - model.feed_cost)
@@ -1,12 +1,17 @@
 from pyomo.environ import *
 from math import log, sqrt
 
-def define_parameters(model):
+def define_parameters(model, design=False):
+    """
+    Declare the parameters. With design, the residence time t and the selectivity S and
+    conversion x depending on it are variables instead, t bounded to the range of the
+    sweep in main.py, and define_constraints adds their correlations as constraints.
+    """
     # Static Parameters
     model.Price = Param(model.comp, initialize={
         'E': 0.05, 'P': 0, 'Tu': 0.10, 'Bz': 0.10, 'EB': 0.25, 'DEB': 0.10},
         doc='Price of each component [Euro per mol]')
-    
+
     model.purityEB = Param(initialize=0.98, doc='Desired purity of product EB')
     model.OHPY = Param(initialize=8150, doc='Operating Hours Per Year')
     model.OSPY = Param(initialize=model.OHPY * 60 * 60, doc='Operating Seconds Per Year')
@@ -17,15 +22,29 @@ def define_parameters(model):
     model.cntTol = Param(initialize=100, doc='Iteration Counter tolerance')
     model.convfact = Param(initialize=1000 / 60 / 60, doc='Conversion factor from [kmol per hr] to [mol per s]')
     model.A = Param(initialize=0, mutable=True, doc='Heat Exchanger Area [sqm]')
-    
-    # Variable Parameter t
-    model.t = Var(initialize=200, within=PositiveReals, doc='Residence time in Reactor [s]')
-    
-    # Derived Parameters
-    def S_rule(model):
-        return 371.60496 / model.t + 0.06379
-    model.S = Param(initialize=S_rule, mutable=True, doc='Selectivity of EB to DEB [n.d]')
-    
-    def x_rule(model):
-        return -0.66214 + 0.23303 * log(model.t)
-    model.x = Param(initialize=x_rule, mutable=True, doc='Single pass conversion of EB [n.d]')
+
+    if design:
+        # Residence time as a decision variable, with S and x following it through constraints
+        model.t = Var(initialize=200, bounds=(5, 300), doc='Residence time in Reactor [s]')
+        model.S = Var(initialize=0, doc='Selectivity of EB to DEB [n.d]')
+        model.x = Var(initialize=0, doc='Single pass conversion of EB [n.d]')
+    else:
+        # Design Parameter t (swept in main.py, as in the GAMS model)
+        model.t = Param(initialize=200, mutable=True, within=PositiveReals, doc='Residence time in Reactor [s]')
+
+        # Derived Parameters, recalculated whenever t changes
+        model.S = Param(initialize=0, mutable=True, doc='Selectivity of EB to DEB [n.d]')
+        model.x = Param(initialize=0, mutable=True, doc='Single pass conversion of EB [n.d]')
+    set_residence_time(model, value(model.t))
+
+    return model
+
+
+def set_residence_time(model, t):
+    """
+    Set the residence time t and the selectivity and conversion that depend on it (in
+    design mode their values, i.e. the starting point of the next solve).
+    """
+    model.t = t
+    model.S = 371.60496 / t + 0.06379
+    model.x = -0.66214 + 0.23303 * log(t)
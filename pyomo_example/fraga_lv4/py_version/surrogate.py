@@ -0,0 +1,201 @@
+import itertools
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+from pyomo.environ import SolverFactory, value
+from parameters import set_residence_time
+from sweep import converged
+
+# Design variables of the surrogates and their ranges: residence time [s] and the
+# recoveries of the three distillation columns (as bounded in variables.py)
+DESIGN_BOUNDS = {'t': (5, 300), 'r1': (0.90, 0.998), 'r2': (0.90, 0.998), 'r3': (0.90, 0.998)}
+
+# Responses recorded at every design point
+RESPONSES = {
+    'EP': lambda model: value(model.EP),
+    'unitcosts': lambda model: value(model.unitcosts),
+    'Feed1': lambda model: sum(value(model.f['Feed1', comp]) for comp in model.comp),
+    'Feed2': lambda model: sum(value(model.f['Feed2', comp]) for comp in model.comp),
+    'LiqRecycle': lambda model: sum(value(model.f['LiqRecycle', comp]) for comp in model.comp),
+    'Byprod': lambda model: sum(value(model.f['Byprod', comp]) for comp in model.comp),
+}
+
+
+def sample_designs(n, bounds=None, method='lhs', seed=None):
+    """
+    n space-filling design points as a DataFrame with one column per design variable:
+    a Latin hypercube ('lhs') or a scrambled Sobol sequence ('sobol').
+    """
+    bounds = bounds or DESIGN_BOUNDS
+    if method == 'lhs':
+        engine = qmc.LatinHypercube(len(bounds), seed=seed)
+    elif method == 'sobol':
+        engine = qmc.Sobol(len(bounds), scramble=True, seed=seed)
+    else:
+        raise ValueError(f"Unknown sampling method '{method}'. Choose from 'lhs' or 'sobol'.")
+    lower, upper = np.array(list(bounds.values()), dtype=float).T
+    return pd.DataFrame(qmc.scale(engine.random(n), lower, upper), columns=list(bounds))
+
+
+def evaluate_designs(model, designs, solver=None, responses=None, tee=False):
+    """
+    Solve the model at every design point, with t set through set_residence_time and the
+    recoveries r1..r3 fixed, and record the responses. Points are visited in order of t so
+    each solve starts from a nearby solution. Returns the designs with the responses and
+    a 'status' column ('ok' or the termination condition); failed points have NaN
+    responses.
+    """
+    if solver is None:
+        solver = SolverFactory('ipopt')
+    responses = responses or RESPONSES
+    recoveries = [name for name in designs.columns if name != 't']
+    start = {name: model.component(name).value for name in recoveries}
+
+    rows = {}
+    try:
+        for index, design in designs.sort_values('t').iterrows():
+            set_residence_time(model, float(design['t']))
+            for name in recoveries:
+                model.component(name).fix(float(design[name]))
+            results = solver.solve(model, tee=tee, load_solutions=False)
+            if converged(results):
+                model.solutions.load_from(results)
+                rows[index] = {name: response(model) for name, response in responses.items()}
+                rows[index]['status'] = 'ok'
+            else:
+                rows[index] = {name: np.nan for name in responses}
+                rows[index]['status'] = str(results.solver.termination_condition)
+    finally:
+        for name in recoveries:
+            model.component(name).unfix()
+            model.component(name).set_value(start[name])
+
+    return pd.concat([designs, pd.DataFrame.from_dict(rows, orient='index').loc[designs.index]], axis=1)
+
+
+class Surrogate:
+    """
+    Least-squares surrogate of one or more responses in the design variables.
+
+    'polynomial' is a full polynomial of the given total degree; 'rbf' interpolates with
+    cubic radial basis functions centred at the training points plus a linear
+    polynomial tail. Inputs are scaled to [0, 1] by the design bounds first, so the
+    residence time does not dominate the distances. predict() is vectorized over rows
+    and evaluates in chunks of chunk_size, so memory stays bounded for millions of
+    candidates.
+    """
+
+    def __init__(self, kind='polynomial', degree=3, bounds=None, chunk_size=65536):
+        if kind not in ('polynomial', 'rbf'):
+            raise ValueError(f"Unknown surrogate kind '{kind}'. Choose from 'polynomial' or 'rbf'.")
+        self.kind = kind
+        self.degree = degree
+        self.bounds = bounds or DESIGN_BOUNDS
+        self.chunk_size = chunk_size
+        self.inputs = list(self.bounds)
+        self.outputs = None
+        self.coefficients = None
+        self.centers = None
+        self._center_norms = None  # Squared norms of the centres, for the RBF distances
+        self._monomials = None  # Exponents of the polynomial terms by degree, built in fit
+        lower, upper = np.array(list(self.bounds.values()), dtype=float).T
+        self._lower, self._span = lower, upper - lower
+
+    def _scale(self, X):
+        return (np.asarray(X, dtype=float) - self._lower) / self._span
+
+    def _exponents(self, degree):
+        """Exponents (terms x inputs) of all monomials up to the total degree."""
+        return np.array([powers for powers in itertools.product(range(degree + 1), repeat=len(self.inputs))
+                         if sum(powers) <= degree])
+
+    def _polynomial_features(self, Z, degree):
+        # Powers of every input once, then products of the needed ones per term
+        powers = Z[:, :, None] ** np.arange(degree + 1)
+        exponents = self._monomials[degree]
+        features = np.ones((len(Z), len(exponents)))
+        for j in range(len(self.inputs)):
+            features *= powers[:, j, exponents[:, j]]
+        return features
+
+    def _rbf_features(self, Z):
+        # |z - c|^2 = |z|^2 + |c|^2 - 2 z.c, so only the (rows x centres) matrix is formed,
+        # not the (rows x centres x inputs) differences; rounding can make it slightly negative
+        squared = (Z ** 2).sum(axis=1)[:, None] + self._center_norms[None, :] - 2 * Z @ self.centers.T
+        distances = np.sqrt(np.maximum(squared, 0.0))
+        return np.hstack([distances ** 3, self._polynomial_features(Z, 1)])
+
+    def fit(self, X, y):
+        """Fit to inputs X (rows x design variables) and responses y (a Series or DataFrame)."""
+        y = pd.DataFrame(y)
+        self.outputs = list(y.columns)
+        Z = self._scale(X[self.inputs] if isinstance(X, pd.DataFrame) else X)
+        self._monomials = {degree: self._exponents(degree) for degree in {self.degree, 1}}
+        if self.kind == 'polynomial':
+            A, b = self._polynomial_features(Z, self.degree), y.to_numpy(dtype=float)
+        else:
+            # Interpolation conditions plus orthogonality of the RBF weights to the tail
+            self.centers = Z
+            self._center_norms = (Z ** 2).sum(axis=1)
+            tail = self._polynomial_features(Z, 1)
+            A = np.block([[self._rbf_features(Z)], [tail.T, np.zeros((tail.shape[1], tail.shape[1]))]])
+            b = np.vstack([y.to_numpy(dtype=float), np.zeros((tail.shape[1], y.shape[1]))])
+        self.coefficients = np.linalg.lstsq(A, b, rcond=None)[0]
+        return self
+
+    def predict(self, X):
+        """Predicted responses, an array (rows x outputs)."""
+        Z = self._scale(X[self.inputs] if isinstance(X, pd.DataFrame) else X)
+        features = self._polynomial_features if self.kind == 'polynomial' else None
+        predictions = np.empty((len(Z), len(self.outputs)))
+        for start in range(0, len(Z), self.chunk_size):
+            chunk = Z[start:start + self.chunk_size]
+            A = features(chunk, self.degree) if features else self._rbf_features(chunk)
+            predictions[start:start + self.chunk_size] = A @ self.coefficients
+        return predictions
+
+
+def cross_validate(X, y, folds=5, seed=None, **surrogate_options):
+    """
+    k-fold cross-validated errors of a Surrogate: RMSE, largest absolute error and R^2 of
+    every response, as a DataFrame indexed by response.
+    """
+    y = pd.DataFrame(y)
+    order = np.random.default_rng(seed).permutation(len(y))
+    predictions = np.empty(y.shape)
+    for fold in np.array_split(order, folds):
+        training = np.setdiff1d(order, fold)
+        surrogate = Surrogate(**surrogate_options).fit(X.iloc[training], y.iloc[training])
+        predictions[fold] = surrogate.predict(X.iloc[fold])
+    errors = predictions - y.to_numpy(dtype=float)
+    variance = y.to_numpy(dtype=float).var(axis=0)
+    return pd.DataFrame({
+        'rmse': np.sqrt((errors ** 2).mean(axis=0)),
+        'max_abs_error': np.abs(errors).max(axis=0),
+        'r2': 1 - (errors ** 2).mean(axis=0) / variance,
+    }, index=y.columns)
+
+
+def build_surrogates(model, n=200, method='lhs', kinds=(('polynomial', 2), ('polynomial', 3), ('rbf', None)),
+                     folds=5, seed=None, solver=None):
+    """
+    Sample n design points, solve them, and fit and cross-validate every surrogate in
+    kinds, (kind, degree) pairs. Returns the evaluated designs, the cross-validation
+    report (indexed by surrogate and response) and the surrogate with the lowest mean
+    relative RMSE, refitted to all converged points.
+    """
+    data = evaluate_designs(model, sample_designs(n, method=method, seed=seed), solver=solver)
+    ok = data[data['status'] == 'ok']
+    X, y = ok[list(DESIGN_BOUNDS)], ok[list(RESPONSES)]
+
+    reports, best, best_error = {}, None, np.inf
+    for kind, degree in kinds:
+        options = {'kind': kind} if degree is None else {'kind': kind, 'degree': degree}
+        label = kind if degree is None else f'{kind}{degree}'
+        reports[label] = cross_validate(X, y, folds=folds, seed=seed, **options)
+        error = (reports[label]['rmse'] / y.std().replace(0, 1)).mean()
+        if error < best_error:
+            best, best_error = options, error
+    report = pd.concat(reports, names=['surrogate', 'response'])
+    print(f"{len(ok)} of {n} design points converged; best surrogate: {best}")
+    return data, report, Surrogate(**best).fit(X, y)
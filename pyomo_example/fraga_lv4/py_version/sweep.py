@@ -0,0 +1,123 @@
+from pyomo.environ import *
+from pyomo.opt import SolverStatus, TerminationCondition
+
+
+def define_warm_start_suffixes(model):
+    """Declare the suffixes that carry ipopt's multipliers from one solve to the next."""
+    if not hasattr(model, 'dual'):
+        model.dual = Suffix(direction=Suffix.IMPORT_EXPORT)
+    model.ipopt_zL_out = Suffix(direction=Suffix.IMPORT)
+    model.ipopt_zU_out = Suffix(direction=Suffix.IMPORT)
+    model.ipopt_zL_in = Suffix(direction=Suffix.EXPORT)
+    model.ipopt_zU_in = Suffix(direction=Suffix.EXPORT)
+    return model
+
+
+def save_point(model):
+    """Snapshot of the primal values and multipliers of a converged solution."""
+    return {
+        'primal': [(var, var.value) for var in model.component_data_objects(Var, descend_into=True)],
+        'dual': dict(model.dual.items()),
+        'zL': dict(model.ipopt_zL_out.items()),
+        'zU': dict(model.ipopt_zU_out.items()),
+    }
+
+
+def restore_point(model, point):
+    """Load a snapshot from save_point as the starting point of the next solve."""
+    for var, value in point['primal']:
+        if not var.fixed:
+            var.set_value(value, skip_validation=True)
+    model.dual.clear()
+    model.dual.update(point['dual'])
+    model.ipopt_zL_in.clear()
+    model.ipopt_zL_in.update(point['zL'])
+    model.ipopt_zU_in.clear()
+    model.ipopt_zU_in.update(point['zU'])
+
+
+def converged(results):
+    return (results.solver.status == SolverStatus.ok and
+            results.solver.termination_condition in (TerminationCondition.optimal,
+                                                     TerminationCondition.locallyOptimal))
+
+
+def continuation_sweep(model, path, set_point, solver=None, warm_start=True, max_halvings=4, record=None, tee=False):
+    """
+    Solve the model at every value of the ordered parameter path.
+
+    set_point(model, value) moves the model to a path value. Each solve is started from
+    the last converged solution, primal values and (with warm_start) the constraint and
+    bound multipliers. When a solve fails, the step from the last converged value is
+    halved, up to max_halvings times, and the target is approached through the
+    intermediate values. A point that still fails is recorded and the sweep continues
+    from the last converged solution.
+
+    Returns one record per path value with its status, termination condition, objective
+    value and number of solves, extended by record(model) for converged points.
+    """
+    if solver is None:
+        solver = SolverFactory('ipopt')
+
+    define_warm_start_suffixes(model)
+    objective = next(model.component_data_objects(Objective, active=True))
+    last_point = None   # Snapshot of the last converged solution
+    last_value = None   # Path value of that solution
+    records = []
+
+    for target in path:
+        current = last_value
+        step = None if current is None else target - current
+        solves = 0
+        halvings = 0
+        termination = None
+
+        while True:
+            if current is None or abs(target - current) <= abs(step):
+                trial = target
+            else:
+                trial = current + step
+            set_point(model, trial)
+            results = solver.solve(model, tee=tee, load_solutions=False)
+            solves += 1
+            termination = results.solver.termination_condition
+
+            if converged(results):
+                model.solutions.load_from(results)
+                last_point = save_point(model)
+                last_value = current = trial
+                if warm_start:
+                    # Start the next solve from this solution and its multipliers
+                    restore_point(model, last_point)
+                    solver.options['warm_start_init_point'] = 'yes'
+                    solver.options['warm_start_bound_push'] = 1e-6
+                    solver.options['warm_start_mult_bound_push'] = 1e-6
+                    solver.options['mu_init'] = 1e-6
+                if trial == target:
+                    break
+                continue
+
+            # Failed: go back to the last converged solution and take a smaller step
+            if current is None or halvings == max_halvings:
+                break
+            restore_point(model, last_point)
+            step = (trial - current) / 2
+            halvings += 1
+
+        entry = {
+            'value': target,
+            'status': 'ok' if last_value == target else 'failed',
+            'termination': str(termination),
+            'objective': None,
+            'solves': solves,
+        }
+        if entry['status'] == 'ok':
+            entry['objective'] = value(objective)
+            if record is not None:
+                entry.update(record(model))
+        elif last_point is not None:
+            restore_point(model, last_point)
+            set_point(model, last_value)
+        records.append(entry)
+
+    return records
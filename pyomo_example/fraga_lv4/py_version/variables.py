@@ -3,37 +3,52 @@ from pyomo.environ import *
 def define_variables(model):
     # Component flow rates in each stream
     model.f = Var(model.stm, model.comp, within=NonNegativeReals, doc='Process component flow rates in stream stm [kmol per hr]')
-    
+
     # Extents of Reaction
     model.xi1 = Var(within=NonNegativeReals, doc='Extent of reaction 1')
     model.xi2 = Var(within=NonNegativeReals, doc='Extent of reaction 2')
     model.xi3 = Var(within=NonNegativeReals, doc='Extent of reaction 3')
-    
+
     # Recovery of key components in distillation columns
     model.r1 = Var(bounds=(0.90, 0.998), doc='Recovery of key components in distillation column 1')
     model.r2 = Var(bounds=(0.90, 0.998), doc='Recovery of key components in distillation column 2')
     model.r3 = Var(bounds=(0.90, 0.998), doc='Recovery of key components in distillation column 3')
-    
+
     # Presence of chemical species in distillation columns top stream
-    model.aD1 = Var(model.comp, within=Binary, doc='Presence of chemical species in distillation col 1 top stream')
-    model.aD2 = Var(model.comp, within=Binary, doc='Presence of chemical species in distillation col 2 top stream')
-    model.aD3 = Var(model.comp, within=Binary, doc='Presence of chemical species in distillation col 3 top stream')
-    
-    # Cost-Related Variables
-    model.feed_cost = Var(within=NonNegativeReals, doc='Cost of Feed 1 and Feed 2 [Million Euros per year]')
-    model.output_sales = Var(within=NonNegativeReals, doc='Sales of Byproduct and Product [Million Euros per year]')
-    model.dist1_c = Var(within=NonNegativeReals, doc='Cost of Distillation column 1 [Millions Euros per year]')
-    model.dist2_c = Var(within=NonNegativeReals, doc='Cost of Distillation column 2 [Millions Euros per year]')
-    model.dist3_c = Var(within=NonNegativeReals, doc='Cost of Distillation column 3 [Millions Euros per year]')
-    model.react_c = Var(within=NonNegativeReals, doc='Cost of Reactor [Millions Euros per year]')
-    model.hex_c = Var(within=NonNegativeReals, doc='Cost of Heat Exchanger [Millions Euros per year]')
-    model.unitcosts = Var(within=NonNegativeReals, doc='Cost of all processing units [Million Euros per year]')
-    model.netvalue = Var(within=Reals, doc='Net value of materials [Million Euros per year]')
-    model.EP = Var(within=Reals, doc='Economic Potential [Million of Euros per year]')
-    
-    # Error Variables
-    model.Err = Var(within=Reals, doc='Error between LiqRecycle and tearLiqRecycle')
-    model.error = Var(within=Reals, doc='Free variable linked to Err')
-    
-    # Objective Variable
-    model.z = Var(within=Reals, doc='Variable equal to Economic Potential (EP)')
+    model.aD1 = Var(model.comp, within=NonNegativeReals, doc='Presence of chemical species in distillation col 1 top stream')
+    model.aD2 = Var(model.comp, within=NonNegativeReals, doc='Presence of chemical species in distillation col 2 top stream')
+    model.aD3 = Var(model.comp, within=NonNegativeReals, doc='Presence of chemical species in distillation col 3 top stream')
+
+    # Non-key species distribute wholly to the top (1) or bottom (0) product
+    for comp, value in {'E': 1, 'P': 1, 'Tu': 0, 'DEB': 0}.items():
+        model.aD1[comp].fix(value)
+    for comp, value in {'E': 1, 'Tu': 0, 'EB': 0, 'DEB': 0}.items():
+        model.aD2[comp].fix(value)
+    for comp, value in {'E': 1, 'P': 1, 'Bz': 1, 'Tu': 1}.items():
+        model.aD3[comp].fix(value)
+
+    # Fixed flows and initial values simulated previously (see gms_version/fraga_lv4_v1.gms)
+    fixed_flows = {
+        ('Feed1', 'P'): 0, ('Feed1', 'Bz'): 0, ('Feed1', 'Tu'): 0, ('Feed1', 'EB'): 0, ('Feed1', 'DEB'): 0,
+        ('Feed2', 'E'): 0, ('Feed2', 'P'): 0, ('Feed2', 'EB'): 0, ('Feed2', 'DEB'): 0,
+        ('Dist1top', 'DEB'): 0,
+        ('Dist1bot', 'E'): 0, ('Dist1bot', 'P'): 0,
+        ('Purge', 'Tu'): 0, ('Purge', 'EB'): 0, ('Purge', 'DEB'): 0,
+        ('LiqRecycle', 'E'): 0, ('LiqRecycle', 'DEB'): 0,
+        ('Prod', 'E'): 0, ('Prod', 'P'): 0, ('Prod', 'EB'): 70.560,
+        ('Byprod', 'E'): 0, ('Byprod', 'P'): 0, ('Byprod', 'Bz'): 0, ('Byprod', 'Tu'): 0,
+    }
+    for (stm, comp), value in fixed_flows.items():
+        model.f[stm, comp].fix(value)
+
+    initial_flows = {
+        ('Feed1', 'E'): 154.587, ('Feed2', 'Bz'): 105.770, ('Feed2', 'Tu'): 5.567,
+        ('Mixeff', 'E'): 154.587, ('Mixeff', 'P'): 0.011, ('Mixeff', 'Bz'): 184.193,
+        ('Mixeff', 'Tu'): 5.567, ('Mixeff', 'EB'): 0.146, ('Mixeff', 'DEB'): 0,
+        ('Reacteff', 'E'): 2.0665E-4, ('Reacteff', 'P'): 5.578, ('Reacteff', 'Bz'): 78.738,
+        ('Reacteff', 'Tu'): 0, ('Reacteff', 'EB'): 73.171, ('Reacteff', 'DEB'): 37.998,
+    }
+    for (stm, comp), value in initial_flows.items():
+        model.f[stm, comp] = value
+
+    return model
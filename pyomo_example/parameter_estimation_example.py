@@ -9,14 +9,223 @@
 #  This software is distributed under the 3-clause BSD License.
 #  ___________________________________________________________________________
 
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
 from os.path import join, abspath, dirname
+from pyomo.environ import (
+    ConcreteModel,
+    Set,
+    Param,
+    Var,
+    Block,
+    Constraint,
+    Objective,
+    SolverFactory,
+    minimize,
+    value,
+)
+from pyomo.core.expr.visitor import replace_expressions
+from pyomo.opt import SolverStatus, TerminationCondition
 import pyomo.contrib.parmest.parmest as parmest
 from pyomo.contrib.parmest.examples.reactor_design.reactor_design import (
     reactor_design_model,
 )
 
 
+# Sum of squared error function
+def SSE(model, data):
+    expr = (
+        (float(data['ca']) - model.ca) ** 2
+        + (float(data['cb']) - model.cb) ** 2
+        + (float(data['cc']) - model.cc) ** 2
+        + (float(data['cd']) - model.cd) ** 2
+    )
+    return expr
+
+
+def build_estimation_model(data, theta_names):
+    """
+    Multi-experiment estimation model: one reactor_design_model block per data row,
+    sharing the theta Vars. Each experiment enters the objective with a mutable weight,
+    so a bootstrap resample (weight = number of draws) or a leave-N-out sample
+    (weight = 0 for the rows left out) only changes Param values, not the model.
+
+    The objective is the weighted mean of the experiment SSEs, sum(weight * SSE) /
+    sum(weight), on the same scale as parmest's objective (the SSE averaged over the
+    experiments), so the two can be compared, e.g. in likelihood_ratio_test.
+    """
+    model = ConcreteModel()
+    model.experiments = Set(initialize=range(len(data)))
+    model.theta = Var(theta_names)
+    model.weight = Param(model.experiments, initialize=1.0, mutable=True)
+    model.experiment = Block(model.experiments)
+
+    for i in model.experiments:
+        experiment = reactor_design_model(data.iloc[i])
+        experiment.del_component(experiment.obj)
+        for name in theta_names:
+            model.theta[name] = value(getattr(experiment, name))
+
+        # Replace the rate constant Params by the shared theta Vars
+        substitution = {id(getattr(experiment, name)): model.theta[name] for name in theta_names}
+        for constraint in experiment.component_data_objects(Constraint):
+            constraint.set_value(replace_expressions(constraint.expr, substitution))
+        model.experiment[i].transfer_attributes_from(experiment)
+
+    model.obj = Objective(
+        expr=sum(model.weight[i] * SSE(model.experiment[i], data.iloc[i]) for i in model.experiments)
+        / sum(model.weight[i] for i in model.experiments),
+        sense=minimize,
+    )
+    return model
+
+
+# Per-process estimation model, built once by _init_estimation_worker
+_worker_model = None
+_worker_solver = None
+_worker_start = None
+
+
+def _init_estimation_worker(data, theta_names, solver_name):
+    global _worker_model, _worker_solver, _worker_start
+    _worker_model = build_estimation_model(data, theta_names)
+    _worker_solver = SolverFactory(solver_name)
+    _worker_start = [(var, var.value) for var in _worker_model.component_data_objects(Var)]
+
+
+def _solve_worker_model(weights=None, theta=None):
+    """
+    Solve the worker model with the given experiment weights (all 1 by default) and,
+    if theta is given, with theta fixed. Every solve starts from the same initial point,
+    so a sample's result does not depend on which samples the worker solved before.
+    Returns (objective, theta dict), or None if the solve failed.
+    """
+    model = _worker_model
+    for var, start in _worker_start:
+        var.set_value(start, skip_validation=True)
+    for i in model.experiments:
+        model.weight[i] = 1.0 if weights is None else weights[i]
+    for name in model.theta:
+        if theta is None:
+            model.theta[name].unfix()
+        else:
+            model.theta[name].fix(theta[name])
+
+    results = _worker_solver.solve(model, load_solutions=False)
+    if (results.solver.status != SolverStatus.ok or
+            results.solver.termination_condition not in (TerminationCondition.optimal,
+                                                         TerminationCondition.locallyOptimal)):
+        return None
+    model.solutions.load_from(results)
+    return value(model.obj), {name: value(model.theta[name]) for name in model.theta}
+
+
+def _estimate_sample(sample, weights):
+    try:
+        return sample, _solve_worker_model(weights=weights)
+    except Exception:
+        return sample, None
+
+
+def _objective_at_sample(sample, theta):
+    try:
+        return sample, _solve_worker_model(theta=theta)
+    except Exception:
+        return sample, None
+
+
+def _run_in_pool(data, theta_names, task, samples, max_workers=None, solver='ipopt'):
+    """
+    Evaluate task(sample, argument) for every item of the samples dict on a process pool
+    and yield (sample, result) in order of completion.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_estimation_worker,
+                             initargs=(data, theta_names, solver)) as executor:
+        futures = [executor.submit(task, sample, argument) for sample, argument in samples.items()]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def bootstrap_theta(data, theta_names, num_samples, seed=None, max_workers=None, solver='ipopt'):
+    """
+    Parameter estimation on num_samples bootstrap resamples of the data.
+
+    Returns a DataFrame (columns = theta_names) with one row per converged resample,
+    equivalent to parmest's Estimator.theta_est_bootstrap.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(data)
+    counts = rng.multinomial(n, np.full(n, 1.0 / n), size=num_samples)
+    samples = {sample: counts[sample].tolist() for sample in range(num_samples)}
+
+    # Aggregate the estimates as the workers return them
+    theta_values = {}
+    failed = 0
+    for sample, result in _run_in_pool(data, theta_names, _estimate_sample, samples, max_workers, solver):
+        if result is None:
+            failed += 1
+        else:
+            theta_values[sample] = result[1]
+    if failed:
+        print(f"Bootstrap: {failed} of {num_samples} resamples did not converge")
+
+    return pd.DataFrame.from_dict(theta_values, orient='index', columns=theta_names).sort_index()
+
+
+def leave_n_out_theta(data, theta_names, lNo, num_samples=None, seed=None, max_workers=None, solver='ipopt'):
+    """
+    Parameter estimation with lNo data rows left out, for every combination of lNo rows
+    or for num_samples random combinations.
+
+    Returns a DataFrame with the rows left out ('lNo') and theta_names, equivalent to
+    parmest's Estimator.theta_est_leaveNout.
+    """
+    combinations = list(itertools.combinations(range(len(data)), lNo))
+    if num_samples is not None and num_samples < len(combinations):
+        rng = np.random.default_rng(seed)
+        chosen = rng.choice(len(combinations), size=num_samples, replace=False)
+        combinations = [combinations[i] for i in sorted(chosen)]
+
+    samples = {}
+    for left_out in combinations:
+        weights = [1.0] * len(data)
+        for i in left_out:
+            weights[i] = 0.0
+        samples[left_out] = weights
+
+    # Aggregate the estimates as the workers return them
+    rows = {}
+    for left_out, result in _run_in_pool(data, theta_names, _estimate_sample, samples, max_workers, solver):
+        if result is not None:
+            rows[left_out] = {'lNo': list(left_out), **result[1]}
+
+    return pd.DataFrame([rows[left_out] for left_out in combinations if left_out in rows],
+                        columns=['lNo'] + list(theta_names))
+
+
+def objective_at_theta(data, theta_names, theta_values, max_workers=None, solver='ipopt'):
+    """
+    Sum of squared errors, averaged over the experiments as in parmest's objective, with
+    theta fixed at every row of theta_values.
+
+    Returns theta_values with an 'obj' column (rows that failed to solve are dropped),
+    the input of parmest's Estimator.likelihood_ratio_test together with the obj of
+    theta_est.
+    """
+    samples = {index: dict(row) for index, row in theta_values[theta_names].iterrows()}
+
+    objectives = {}
+    for index, result in _run_in_pool(data, theta_names, _objective_at_sample, samples, max_workers, solver):
+        if result is not None:
+            objectives[index] = result[0]
+
+    obj_at_theta = theta_values.loc[[index for index in theta_values.index if index in objectives]].copy()
+    obj_at_theta['obj'] = [objectives[index] for index in obj_at_theta.index]
+    return obj_at_theta
+
+
 def main():
     # Vars to estimate
     theta_names = ['k1', 'k2', 'k3']
@@ -26,16 +235,6 @@ def main():
     file_name = abspath(join(file_dirname, 'reactor_data.csv'))
     data = pd.read_csv(file_name)
 
-    # Sum of squared error function
-    def SSE(model, data):
-        expr = (
-            (float(data['ca']) - model.ca) ** 2
-            + (float(data['cb']) - model.cb) ** 2
-            + (float(data['cc']) - model.cc) ** 2
-            + (float(data['cd']) - model.cd) ** 2
-        )
-        return expr
-
     # Create an instance of the parmest estimator
     pest = parmest.Estimator(reactor_design_model, data, theta_names, SSE)
 
@@ -53,6 +252,28 @@ def main():
     relative_error = abs(theta['k3'] - k3_expected) / k3_expected
     assert relative_error < 0.05
 
+    alphas = [0.8, 0.85, 0.9, 0.95]
+
+    # Bootstrap confidence region, and whether the estimate lies inside it
+    bootstrap_theta_values = bootstrap_theta(data, theta_names, num_samples=200, seed=524)
+    print(bootstrap_theta_values.describe())
+    training_results, test_results = pest.confidence_region_test(
+        bootstrap_theta_values, 'MVN', alphas, test_theta_values=theta
+    )
+    print(test_results)
+
+    # Leave one out
+    lNo_theta_values = leave_n_out_theta(data, theta_names, lNo=1)
+    print(lNo_theta_values)
+
+    # Likelihood ratio test on a (k1, k2) grid, k3 at its estimate
+    k1 = np.linspace(0.9 * theta['k1'], 1.1 * theta['k1'], 11)
+    k2 = np.linspace(0.9 * theta['k2'], 1.1 * theta['k2'], 11)
+    grid = pd.DataFrame(list(itertools.product(k1, k2, [theta['k3']])), columns=theta_names)
+    obj_at_theta = objective_at_theta(data, theta_names, grid)
+    LR = pest.likelihood_ratio_test(obj_at_theta, obj, alphas)
+    print(LR[alphas].sum().rename('theta values inside the region'))
+
 
 if __name__ == "__main__":
     main()
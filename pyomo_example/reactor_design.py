@@ -22,7 +22,10 @@ from pyomo.environ import (
     Constraint,
     maximize,
     SolverFactory,
+    Suffix,
 )
+from pyomo.opt import SolverStatus, TerminationCondition
+from run_store import RunStore
 
 
 def reactor_design_model(data):
@@ -37,10 +40,10 @@ def reactor_design_model(data):
     )  # m^3/(gmol min)
 
     # Inlet concentration of A, gmol/m^3
-    model.caf = Param(initialize=float(data['caf']), within=PositiveReals)
+    model.caf = Param(initialize=float(data['caf']), within=PositiveReals, mutable=True)
 
     # Space velocity (flowrate/volume)
-    model.sv = Param(initialize=float(data['sv']), within=PositiveReals)
+    model.sv = Param(initialize=float(data['sv']), within=PositiveReals, mutable=True)
 
     # Outlet concentration of each component
     model.ca = Var(initialize=5000.0, within=PositiveReals)
@@ -75,20 +78,79 @@ def reactor_design_model(data):
     return model
 
 
+def reactor_design_sweep(data, solver=None, warm_start=True):
+    """
+    Solve the reactor for every (sv, caf) row of data on a single model.
+
+    The model is built once and only its mutable sv and caf parameters change between
+    points. The points are visited sorted by (caf, sv) so that each solve starts close
+    to the previous solution; with warm_start the multipliers of that solution are
+    passed to ipopt as well. Returns a DataFrame in the order of data.
+    """
+    data = pd.DataFrame(data)
+    if solver is None:
+        solver = SolverFactory('ipopt')
+
+    model = reactor_design_model(data.iloc[0])
+    if warm_start:
+        model.dual = Suffix(direction=Suffix.IMPORT_EXPORT)
+        model.ipopt_zL_out = Suffix(direction=Suffix.IMPORT)
+        model.ipopt_zU_out = Suffix(direction=Suffix.IMPORT)
+        model.ipopt_zL_in = Suffix(direction=Suffix.EXPORT)
+        model.ipopt_zU_in = Suffix(direction=Suffix.EXPORT)
+
+    results = {}
+    for index, row in data.sort_values(['caf', 'sv']).iterrows():
+        model.sv = float(row['sv'])
+        model.caf = float(row['caf'])
+        status = solver.solve(model, load_solutions=False)
+        termination = status.solver.termination_condition
+
+        if status.solver.status == SolverStatus.ok and termination == TerminationCondition.optimal:
+            model.solutions.load_from(status)
+            results[index] = [row['sv'], row['caf'], model.ca(), model.cb(), model.cc(), model.cd(), str(termination)]
+            if warm_start:
+                model.ipopt_zL_in.update(model.ipopt_zL_out)
+                model.ipopt_zU_in.update(model.ipopt_zU_out)
+                solver.options['warm_start_init_point'] = 'yes'
+                solver.options['warm_start_bound_push'] = 1e-6
+                solver.options['warm_start_mult_bound_push'] = 1e-6
+        else:
+            # Keep the last converged values as the starting point of the next solve
+            results[index] = [row['sv'], row['caf'], None, None, None, None, str(termination)]
+
+    return pd.DataFrame([results[index] for index in data.index], index=data.index,
+                        columns=['sv', 'caf', 'ca', 'cb', 'cc', 'cd', 'termination'])
+
+
+def run_records(results):
+    """
+    RunStore records of the points of reactor_design_sweep. The objective is cb, and
+    the stream table holds the outlet concentrations (gmol/m^3) as its one stream.
+    """
+    return [{
+        'flowsheet': 'reactor_design',
+        'status': 'ok' if row['termination'] == str(TerminationCondition.optimal) else 'failed',
+        'termination': row['termination'],
+        'solve_time': None,
+        'objective': row['cb'],
+        'parameters': {'sv': row['sv'], 'caf': row['caf']},
+        'stream_table': pd.DataFrame([[row['ca'], row['cb'], row['cc'], row['cd']]],
+                                     index=['outlet'], columns=['A', 'B', 'C', 'D']),
+    } for _, row in results.iterrows()]
+
+
 def main():
     # For a range of sv values, return ca, cb, cc, and cd
-    results = []
     sv_values = [1.0 + v * 0.05 for v in range(1, 20)]
     caf = 10000
-    for sv in sv_values:
-        model = reactor_design_model({'caf': caf, 'sv': sv})
-        solver = SolverFactory('ipopt')
-        solver.solve(model)
-        results.append([sv, caf, model.ca(), model.cb(), model.cc(), model.cd()])
-
-    results = pd.DataFrame(results, columns=['sv', 'caf', 'ca', 'cb', 'cc', 'cd'])
+    results = reactor_design_sweep({'sv': sv_values, 'caf': [caf] * len(sv_values)})
     print(results)
 
+    # Keep every point in the run history database
+    with RunStore('run_history.db') as run_store:
+        run_store.add_runs(run_records(results))
+
 
 if __name__ == "__main__":
     main()